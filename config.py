@@ -1,9 +1,22 @@
 INFINITY = 10 ** 32
 GEOMETRIC_INACCURACY = 0.01
-ARC_DISCRETISATION = 50
+ARC_DISCRETISATION = 50  # наибольшее число точек ломаной, которой рисуется дуга
+ARC_DRAW_TOLERANCE = 0.05  # наибольшее отклонение ломаной от рисуемой дуги
+ROAD_WORKERS = 1  # число процессов для построения дорог (1 - без пула процессов)
+ROADS_IN_TASK = 64  # сколько пар точек отдаётся процессу за одну задачу
+PAIRS_CHUNK_ELEMENTS = 2 ** 22  # сколько элементов (пара точек x зона) считать за один векторный проход
 ARC_WIDTH = 1.3
 LINE_WIDTH = 1.2
+HELD_KARP_MAX_POINTS = 18  # до стольких точек задача решается точно алгоритмом Хелда-Карпа
+EXACT_SOLVER_MAX_POINTS = 25  # до стольких точек задача решается точно алгоритмом Литтла
+HEURISTIC_NEIGHBOURS = 10  # число ближайших соседей, рассматриваемых в ходах эвристики
+ZONE_GRID_MAX_CELLS = 2 ** 20  # верхняя граница числа клеток сетки над запретными зонами
+GRID_SEGMENTS_CHUNK = 2 ** 16  # сколько отрезков проверять по сетке зон за один векторный проход
+ROADS_CACHE_DIR = ".roads_cache"  # каталог кэша матриц дорог
+ROADS_CACHE_VERSION = 1  # увеличивается при изменении алгоритма построения дорог
+SCENARIO_READ_CHUNK = 2 ** 16  # сколько символов файла сценария читается за раз при потоковом чтении
 LOG_FILE = "log.txt"
+PLOT_FILE = None  # файл рисунка маршрута (.png, .svg); None - показать окно matplotlib
 INPUT_FILE = "input.json"
 TEST_READ_DATA_FILE = "test_read_data.json"
 LINE_COLOR = "black"
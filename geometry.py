@@ -1,12 +1,22 @@
-from typing import Union, List, Optional
+from typing import Union, List, Optional, Tuple
 
 import math
 import numpy as np
 
-from config import GEOMETRIC_INACCURACY
+from config import GEOMETRIC_INACCURACY, PAIRS_CHUNK_ELEMENTS
+
+
+RELATIVE_TOLERANCE = 1e-5  # относительная погрешность сравнения координат (как rtol у np.isclose)
+
+
+def isclose(a: float, b: float, atol: float = GEOMETRIC_INACCURACY) -> bool:
+    """То же, что np.isclose(a, b, atol=atol), но для чисел и без создания массивов"""
+    return abs(a - b) <= atol + RELATIVE_TOLERANCE * abs(b)
 
 
 class Point:
+    __slots__ = ("x", "y")
+
     def __init__(self, x: Union[int, float], y: Union[int, float]) -> None:
         self.x = x
         self.y = y
@@ -15,18 +25,19 @@ class Point:
         return f"Point: x={self.x}, y={self.y}"
 
     def __eq__(self, other) -> bool:
-        return np.isclose(self.x, other.x, atol=GEOMETRIC_INACCURACY) \
-               and np.isclose(self.y, other.y, atol=GEOMETRIC_INACCURACY)
+        return isclose(self.x, other.x) and isclose(self.y, other.y)
 
 
 class Circle(Point):
+    __slots__ = ("r",)
+
     def __init__(self, x: Union[int, float], y: Union[int, float], r: Union[int, float]) -> None:
         self.r = abs(r)
         super().__init__(x, y)
 
     def __eq__(self, other) -> bool:
         if other:
-            return np.isclose(self.r, other.r, atol=GEOMETRIC_INACCURACY) and self.center() == other.center()
+            return isclose(self.r, other.r) and isclose(self.x, other.x) and isclose(self.y, other.y)
         return False
 
     def __repr__(self) -> str:
@@ -37,6 +48,8 @@ class Circle(Point):
 
 
 class Line:
+    __slots__ = ("a", "b", "c")
+
     def __init__(self, a: Union[int, float], b: Union[int, float], c: Union[int, float]) -> None:
         self.a = a
         self.b = b
@@ -55,9 +68,9 @@ class Line:
             aspect_ratio = self.b / other.b
         elif other.c != 0:
             aspect_ratio = self.c / other.c
-        return (np.isclose(self.a, other.a * aspect_ratio, atol=GEOMETRIC_INACCURACY)
-                and np.isclose(self.b, other.b * aspect_ratio, atol=GEOMETRIC_INACCURACY)
-                and np.isclose(self.c, other.c * aspect_ratio, atol=GEOMETRIC_INACCURACY))
+        return (isclose(self.a, other.a * aspect_ratio)
+                and isclose(self.b, other.b * aspect_ratio)
+                and isclose(self.c, other.c * aspect_ratio))
 
 
 def tangent_from_point_to_circle(point: Point, circle: Circle) -> List[Line]:
@@ -138,3 +151,180 @@ def solve_quadratic_equation(a: Union[int, float], b: Union[int, float], c: Unio
     t1 = (-b + d ** 0.5) / (2 * a)
     t2 = (-b - d ** 0.5) / (2 * a)
     return [t1, t2] if d > 0 else [t1,]
+
+
+def line_by_two_points_batch(points1: np.ndarray, points2: np.ndarray) -> np.ndarray:
+    """line_by_two_points сразу для массивов точек (K, 2); возвращает коэффициенты прямых a, b, c, shape (K, 3)"""
+    points1 = np.asarray(points1, dtype=np.float64).reshape(-1, 2)
+    points2 = np.asarray(points2, dtype=np.float64).reshape(-1, 2)
+    vertical = points1[:, 0] == points2[:, 0]
+    dx = np.where(vertical, 1.0, points2[:, 0] - points1[:, 0])
+    a = np.where(vertical, 1.0, (points1[:, 1] - points2[:, 1]) / dx)
+    b = np.where(vertical, 0.0, 1.0)
+    c = np.where(vertical, -points1[:, 0], -a * points1[:, 0] - points1[:, 1])
+    return np.column_stack([a, b, c])
+
+
+def distance_between_points_batch(points1: np.ndarray, points2: np.ndarray) -> np.ndarray:
+    """distance_between_points для массивов точек (K, 2), shape (K,)"""
+    points1 = np.asarray(points1, dtype=np.float64).reshape(-1, 2)
+    points2 = np.asarray(points2, dtype=np.float64).reshape(-1, 2)
+    return np.hypot(points2[:, 0] - points1[:, 0], points2[:, 1] - points1[:, 1])
+
+
+def tangent_from_point_to_circle_batch(points: np.ndarray, circles: np.ndarray) -> np.ndarray:
+    """tangent_from_point_to_circle для точек (K, 2) и окружностей (K, 3)
+
+    Возвращает по две касательные на каждую пару в виде коэффициентов a, b, c, shape (K, 2, 3).
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+    r = np.abs(circles[:, 2])
+    lx = circles[:, 0] - points[:, 0]
+    ly = circles[:, 1] - points[:, 1]
+    direction = np.arctan2(ly, lx)
+    half_angle = np.arcsin(r / np.hypot(lx, ly))
+    touches1 = np.column_stack([r * np.sin(direction - half_angle) + circles[:, 0],
+                                r * -np.cos(direction - half_angle) + circles[:, 1]])
+    touches2 = np.column_stack([r * -np.sin(direction + half_angle) + circles[:, 0],
+                                r * np.cos(direction + half_angle) + circles[:, 1]])
+    return np.stack([line_by_two_points_batch(touches1, points),
+                     line_by_two_points_batch(touches2, points)], axis=1)
+
+
+def crossings_batch(lines: np.ndarray, circles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """crossings для прямых (K, 3) и окружностей (K, 3)
+
+    Возвращает точки пересечения shape (K, 2, 2) и их количество (0, 1 или 2) для каждой пары;
+    при одной точке касания обе строки совпадают, при отсутствии пересечения точки - nan.
+    """
+    lines = np.asarray(lines, dtype=np.float64).reshape(-1, 3)
+    circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+    a, b, c = lines.T
+    vec_len = np.hypot(a, b)
+    distance = (a * circles[:, 0] + b * circles[:, 1] + c) / vec_len
+    crossed = np.abs(distance) - np.abs(circles[:, 2]) <= GEOMETRIC_INACCURACY / 10
+    r = np.maximum(np.abs(circles[:, 2]), np.abs(distance))  # поправка на погрешность вычислений
+    dir_sin, dir_cos = a / vec_len, b / vec_len
+    xo = circles[:, 0] - distance * dir_sin
+    yo = circles[:, 1] - distance * dir_cos
+    half_chord_len = np.sqrt(np.maximum(r ** 2 - distance ** 2, 0))
+    first = np.column_stack([xo + half_chord_len * dir_cos, yo - half_chord_len * dir_sin])
+    second = np.column_stack([xo - half_chord_len * dir_cos, yo + half_chord_len * dir_sin])
+    same = np.isclose(first, second, atol=GEOMETRIC_INACCURACY, rtol=RELATIVE_TOLERANCE).all(axis=1)
+    second[same] = first[same]
+    points = np.stack([first, second], axis=1)
+    points[~crossed] = np.nan
+    return points, np.where(crossed, np.where(same, 1, 2), 0)
+
+
+def arc_point_counts(sweeps: np.ndarray, radii: np.ndarray, tolerance: float, max_points: int) -> np.ndarray:
+    """Сколько точек нужно ломаной, чтобы отклоняться от дуги не больше чем на tolerance
+
+    sweeps - углы дуг в радианах, radii - радиусы. Хорда на угол phi отходит от дуги на r * (1 - cos(phi / 2)),
+    поэтому шаг берётся 2 * arccos(1 - tolerance / r); число точек - от 2 до max_points.
+    """
+    sweeps = np.abs(np.asarray(sweeps, dtype=np.float64))
+    radii = np.abs(np.asarray(radii, dtype=np.float64))
+    step = 2 * np.arccos(np.clip(1 - tolerance / np.maximum(radii, tolerance), -1, 1))
+    return np.clip(np.ceil(sweeps / step).astype(np.int64) + 1, 2, max_points)
+
+
+def segment_circle_crossings(point1: Point, point2: Point, circles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Пересечения отрезка point1-point2 сразу со всеми окружностями за один проход NumPy
+
+    circles - массив (M, 3) из x, y, r. Возвращает маску пересечённых (или касаемых) окружностей
+    и параметр t ∈ [0, 1] ближайшей к point1 точки пересечения вдоль отрезка (np.inf, если пересечения нет).
+    """
+    start = np.array([point1.x, point1.y], dtype=np.float64)
+    finish = np.array([point2.x, point2.y], dtype=np.float64)
+    t = _nearest_crossing_parameters(start, finish, np.asarray(circles, dtype=np.float64).reshape(-1, 3))
+    return np.isfinite(t), t
+
+
+def blocked_segments(starts: np.ndarray, finishes: np.ndarray, circles: np.ndarray) -> np.ndarray:
+    """Для K отрезков starts[k]-finishes[k] определяет, пересекает ли отрезок хотя бы одну окружность
+
+    starts, finishes - массивы (K, 2), circles - (M, 3). Возвращает булев массив (K,).
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    finishes = np.asarray(finishes, dtype=np.float64).reshape(-1, 2)
+    circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+    blocked = np.zeros(len(starts), dtype=bool)
+    if len(starts) == 0 or len(circles) == 0:
+        return blocked
+    rows_in_chunk = max(1, PAIRS_CHUNK_ELEMENTS // len(circles))
+    for first in range(0, len(starts), rows_in_chunk):
+        last = first + rows_in_chunk
+        t = _nearest_crossing_parameters(starts[first:last], finishes[first:last], circles)
+        blocked[first:last] = np.isfinite(t).any(axis=-1)
+    return blocked
+
+
+def segments_enter_circles(starts: np.ndarray, finishes: np.ndarray, circles: np.ndarray) -> np.ndarray:
+    """Для K отрезков определяет, заходит ли отрезок внутрь хотя бы одной окружности
+
+    В отличие от blocked_segments касание не считается: отрезок заходит в круг, если ближайшая к центру
+    точка отрезка ближе r - GEOMETRIC_INACCURACY / 10. Так отрезки, касающиеся зон, остаются допустимыми.
+    Отрезок нулевой длины проверяется как точка. Возвращает булев массив (K,).
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    finishes = np.asarray(finishes, dtype=np.float64).reshape(-1, 2)
+    circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+    inside = np.zeros(len(starts), dtype=bool)
+    if len(starts) == 0 or len(circles) == 0:
+        return inside
+    rows_in_chunk = max(1, PAIRS_CHUNK_ELEMENTS // len(circles))
+    for first in range(0, len(starts), rows_in_chunk):
+        start = starts[first:first + rows_in_chunk]
+        direction = finishes[first:first + rows_in_chunk] - start
+        dd = np.einsum("ki,ki->k", direction, direction)[:, np.newaxis]
+        to_center = circles[np.newaxis, :, :2] - start[:, np.newaxis, :]  # (K, M, 2)
+        projection = np.einsum("kmi,ki->km", to_center, direction)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.clip(np.where(dd > 0, projection / dd, 0), 0, 1)
+        gap = to_center - t[..., np.newaxis] * direction[:, np.newaxis, :]
+        r = np.maximum(circles[:, 2] - GEOMETRIC_INACCURACY / 10, 0)
+        inside[first:first + rows_in_chunk] = (np.einsum("kmi,kmi->km", gap, gap) < r ** 2).any(axis=-1)
+    return inside
+
+
+def segments_enter_circle_pairs(starts: np.ndarray, finishes: np.ndarray, circles: np.ndarray) -> np.ndarray:
+    """Для K пар (отрезок starts[k]-finishes[k], окружность circles[k]) определяет, заходит ли отрезок в окружность
+
+    Критерий тот же, что в segments_enter_circles, но каждый отрезок проверяется только со своей окружностью:
+    так считаются пары отрезок - зона-кандидат, отобранные сеткой (см. ZoneGrid.segments_candidates).
+    starts, finishes - массивы (K, 2), circles - (K, 3). Возвращает булев массив (K,).
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    direction = np.asarray(finishes, dtype=np.float64).reshape(-1, 2) - starts
+    circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+    dd = np.einsum("ki,ki->k", direction, direction)
+    to_center = circles[:, :2] - starts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(np.where(dd > 0, np.einsum("ki,ki->k", to_center, direction) / dd, 0), 0, 1)
+    gap = to_center - t[:, np.newaxis] * direction
+    r = np.maximum(circles[:, 2] - GEOMETRIC_INACCURACY / 10, 0)
+    return np.einsum("ki,ki->k", gap, gap) < r ** 2
+
+
+def _nearest_crossing_parameters(starts: np.ndarray, finishes: np.ndarray, circles: np.ndarray) -> np.ndarray:
+    """Параметры t ближайших к началу точек пересечения отрезков с окружностями
+
+    starts, finishes - массивы (..., 2), circles - (M, 3). Результат имеет форму (..., M), np.inf - нет пересечения.
+    Критерий касания тот же, что в crossings: прямая проходит не дальше GEOMETRIC_INACCURACY / 10 от окружности.
+    """
+    direction = finishes - starts
+    dd = np.einsum("...i,...i->...", direction, direction)[..., np.newaxis]  # квадрат длины отрезка
+    to_center = circles[:, :2] - starts[..., np.newaxis, :]  # (..., M, 2)
+    projection = np.einsum("...mi,...i->...m", to_center, direction)
+    r = circles[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_center = projection / dd  # параметр проекции центра на прямую
+        h2 = np.maximum(np.einsum("...mi,...mi->...m", to_center, to_center) - projection * t_center, 0)
+        half_chord = np.sqrt(np.maximum(r ** 2 - h2, 0) / dd)  # половина хорды в единицах параметра
+    crossed = (np.sqrt(h2) - r <= GEOMETRIC_INACCURACY / 10) & (dd > 0)
+    t1 = t_center - half_chord
+    t2 = t_center + half_chord
+    t = np.where((t1 >= 0) & (t1 <= 1), t1, np.where((t2 >= 0) & (t2 <= 1), t2, np.inf))
+    return np.where(crossed, t, np.inf)
@@ -0,0 +1,407 @@
+import numpy as np
+
+from config import INFINITY
+
+"""
+Быстрые эвристики для задачи Коммивояжёра: ближайший сосед, 2-opt и Or-opt.
+
+Матрица может быть несимметричной и содержать np.inf и INFINITY (запрещённые коридоры), поэтому
+приращения длины считаются в двух каналах: число запрещённых рёбер и сумма длин остальных рёбер.
+Ход улучшает обход, если уменьшает число запрещённых рёбер, или при том же их числе укорачивает обход.
+"""
+
+EPSILON = 1e-9  # минимальное улучшение, которое считается улучшением
+OBJECTIVES = ("total", "makespan")  # цель для нескольких маршрутов: сумма длин или длина самого длинного
+
+
+def tour_length(matrix, tour):
+    """Длина замкнутого обхода tour (массив номеров вершин)"""
+    tour = np.asarray(tour)
+    return matrix[tour, np.roll(tour, -1)].sum()
+
+
+def nearest_neighbour_tour(matrix, begin=0):
+    """Обход методом ближайшего соседа, начиная с вершины begin"""
+    n = matrix.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    tour = np.empty(n, dtype=np.int64)
+    tour[0] = begin
+    visited[begin] = True
+    for k in range(1, n):
+        candidates = np.flatnonzero(~visited)
+        tour[k] = candidates[np.argmin(matrix[tour[k - 1], candidates])]
+        visited[tour[k]] = True
+    return tour
+
+
+def improve_tour(matrix, tour, neighbours=None):
+    """Чередует 2-opt и Or-opt, пока они улучшают обход. Первая вершина обхода остаётся на месте"""
+    costs = _Costs(matrix)
+    tour = np.array(tour, dtype=np.int64)
+    improved = True
+    while improved:
+        tour, improved2opt = _two_opt(costs, tour, neighbours)
+        tour, improvedOrOpt = _or_opt(costs, tour, neighbours)
+        improved = improved2opt or improvedOrOpt
+    return tour
+
+
+def two_opt(matrix, tour, neighbours=None):
+    """Улучшает обход разворотами участков (2-opt), пока это возможно
+
+    neighbours - необязательный массив (n, K) ближайших соседей каждой вершины: тогда для вершины
+    проверяются только ходы, которые соединяют её с одним из соседей.
+    """
+    return _two_opt(_Costs(matrix), np.array(tour, dtype=np.int64), neighbours)[0]
+
+
+def or_opt(matrix, tour, neighbours=None, maxSegment=3):
+    """Улучшает обход переносом участков из 1..maxSegment вершин на другое место (Or-opt), пока это возможно"""
+    return _or_opt(_Costs(matrix), np.array(tour, dtype=np.int64), neighbours, maxSegment)[0]
+
+
+def double_bridge(tour, rng):
+    """Возмущение double-bridge: обход A B C D превращается в A C B D (первая вершина остаётся на месте)"""
+    tour = np.asarray(tour)
+    if tour.size < 8:
+        return tour.copy()
+    a, b, c = np.sort(rng.choice(np.arange(1, tour.size), 3, replace=False))
+    return np.concatenate([tour[:a], tour[b:c], tour[a:b], tour[c:]])
+
+
+def nearest_neighbours(matrix, count):
+    """Для каждой вершины - count ближайших к ней вершин, shape (n, count)"""
+    n = matrix.shape[0]
+    count = min(count, n - 1)
+    distances = np.array(matrix, dtype=np.float64)
+    np.fill_diagonal(distances, np.inf)
+    neighbours = np.argpartition(distances, count - 1, axis=1)[:, :count]
+    order = np.argsort(np.take_along_axis(distances, neighbours, axis=1), axis=1)
+    return np.take_along_axis(neighbours, order, axis=1)
+
+
+class _Costs:
+    """Матрица, разделённая на два канала: признак запрещённого ребра и длина разрешённого"""
+
+    def __init__(self, matrix):
+        self.forbidden = ~(np.asarray(matrix) < INFINITY)
+        self.length = np.where(self.forbidden, 0, matrix).astype(np.float64)
+
+    def __call__(self, rows, cols):
+        return self.forbidden[rows, cols].astype(np.int64), self.length[rows, cols]
+
+
+def _disjoint_moves(forbiddenDelta, lengthDelta, lows, highs, size):
+    """Улучшающие ходы от лучшего к худшему, жадно отобранные так, чтобы затронутые участки обхода не пересекались
+
+    Ходы на непересекающихся участках не влияют на приращения друг друга, поэтому их можно применить все сразу.
+    """
+    improving = np.flatnonzero((forbiddenDelta < 0) | ((forbiddenDelta == 0) & (lengthDelta < -EPSILON)))
+    order = improving[np.lexsort((lengthDelta[improving], forbiddenDelta[improving]))]
+    touched = np.zeros(size + 1, dtype=bool)
+    chosen = []
+    for k in order:
+        if not touched[lows[k]:highs[k] + 1].any():
+            touched[lows[k]:highs[k] + 1] = True
+            chosen.append(k)
+    return chosen
+
+
+def _positions(tour):
+    position = np.empty(tour.size, dtype=np.int64)
+    position[tour] = np.arange(tour.size)
+    return np.append(tour, tour[0]), position
+
+
+def _prefix_costs(costs, closed):
+    """Префиксные суммы рёбер обхода в прямом и обратном направлении (оба канала)"""
+    forward = costs(closed[:-1], closed[1:])
+    backward = costs(closed[1:], closed[:-1])
+    return [np.concatenate([[0], np.cumsum(part)]) for part in forward + backward]
+
+
+def _two_opt(costs, tour, neighbours=None):
+    n = tour.size
+    if n < 4:
+        return tour, False
+    improvedAny = False
+    while True:
+        closed, position = _positions(tour)
+        forwardF, forwardL, backwardF, backwardL = _prefix_costs(costs, closed)
+        # Ход (i, j): рёбра (c[i], c[i+1]) и (c[j], c[j+1]) заменяются на (c[i], c[j]) и (c[i+1], c[j+1]),
+        # а участок c[i+1..j] разворачивается. Все ходы оцениваются сразу
+        if neighbours is None:
+            i, j = np.triu_indices(n, 2)
+        else:
+            i = np.repeat(np.arange(n), neighbours.shape[1])
+            j = position[neighbours[tour].ravel()]
+            valid = j > i + 1
+            i, j = i[valid], j[valid]
+        addedF, addedL = costs(closed[i], closed[j])
+        added2F, added2L = costs(closed[i + 1], closed[j + 1])
+        removedF, removedL = costs(closed[i], closed[i + 1])
+        removed2F, removed2L = costs(closed[j], closed[j + 1])
+        deltaF = addedF + added2F - removedF - removed2F \
+            + (backwardF[j] - backwardF[i + 1]) - (forwardF[j] - forwardF[i + 1])
+        deltaL = addedL + added2L - removedL - removed2L \
+            + (backwardL[j] - backwardL[i + 1]) - (forwardL[j] - forwardL[i + 1])
+
+        moves = _disjoint_moves(deltaF, deltaL, i, j + 1, n)
+        if not moves:
+            return tour, improvedAny
+        for k in moves:
+            tour[i[k] + 1:j[k] + 1] = tour[i[k] + 1:j[k] + 1][::-1].copy()
+        improvedAny = True
+
+
+def _or_opt(costs, tour, neighbours=None, maxSegment=3):
+    n = tour.size
+    if n < 4:
+        return tour, False
+    improvedAny = False
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, min(maxSegment, n - 2) + 1):
+            closed, position = _positions(tour)
+            # Участок c[s..e] переносится между c[p] и c[p+1] вне участка. Все ходы оцениваются сразу
+            if neighbours is None:
+                start = np.repeat(np.arange(1, n - length + 1), n)
+                p = np.tile(np.arange(n), n - length)
+            else:
+                start = np.repeat(np.arange(1, n - length + 1), neighbours.shape[1])
+                p = position[neighbours[tour[1:n - length + 1]].ravel()]
+            end = start + length - 1
+            valid = (p < start - 1) | (p > end)
+            start, end, p = start[valid], end[valid], p[valid]
+            before, first, last, after = closed[start - 1], closed[start], closed[end], closed[end + 1]
+
+            cutF, cutL = (x + y - z for x, y, z in zip(costs(before, first), costs(last, after), costs(before, after)))
+            insertedF, insertedL = costs(closed[p], first)
+            inserted2F, inserted2L = costs(last, closed[p + 1])
+            brokenF, brokenL = costs(closed[p], closed[p + 1])
+            moves = _disjoint_moves(insertedF + inserted2F - brokenF - cutF, insertedL + inserted2L - brokenL - cutL,
+                                    np.minimum(start - 1, p), np.maximum(end + 1, p + 1), n)
+            for k in moves:
+                s, e, q = start[k], end[k], p[k]
+                segment = tour[s:e + 1].copy()
+                if q < s:
+                    tour[q + 1:e + 1] = np.concatenate([segment, tour[q + 1:s]])
+                else:
+                    tour[s:q + 1] = np.concatenate([tour[e + 1:q + 1], segment])
+            if moves:
+                improved = improvedAny = True
+    return tour, improvedAny
+
+
+def route_length(matrix, route, begin):
+    """Длина маршрута begin -> route -> begin (route - вершины без начальной); пустой маршрут имеет длину 0"""
+    if len(route) == 0:
+        return 0.0
+    nodes = np.concatenate([[begin], route, [begin]]).astype(np.int64)
+    return matrix[nodes[:-1], nodes[1:]].sum()
+
+
+def split_tour(matrix, tour, routeCount, limit=np.inf, objective="total"):
+    """Делит обход tour (tour[0] - начальная вершина) на не более чем routeCount маршрутов
+
+    Вершины каждого маршрута - подряд идущий участок обхода, маршрут не длиннее limit, минимальна сумма
+    длин маршрутов (objective="total") или длина самого длинного (objective="makespan") - разбиение
+    динамическим программированием. Стоимости всех участков считаются
+    одной матрицей по префиксным суммам обхода, поэтому слой ДП - одна векторная операция.
+    Если с ограничением limit разбить нельзя, ограничение не учитывается. Возвращает список маршрутов
+    (вершины без начальной), недостающие маршруты пустые.
+    """
+    tour = np.asarray(tour, dtype=np.int64)
+    begin, customers = tour[0], tour[1:]
+    n = customers.size
+    if n == 0:
+        return [[] for _ in range(routeCount)]
+    prefix = np.concatenate([[0], np.cumsum(matrix[customers[:-1], customers[1:]])])
+    # cost[i, j] - маршрут через customers[i..j]
+    cost = matrix[begin, customers][:, np.newaxis] + prefix[np.newaxis, :] - prefix[:, np.newaxis] \
+        + matrix[customers, begin][np.newaxis, :]
+    cost = np.where(np.triu(np.ones((n, n), dtype=bool)), cost, np.inf)
+    bounded = np.where(cost <= limit, cost, np.inf)
+
+    for costs in (bounded, cost):
+        best = np.full(n + 1, np.inf)  # best[m] - первые m вершин разбиты на маршруты
+        best[0] = 0
+        layers, totals = [], [np.inf]
+        for _ in range(min(routeCount, n)):
+            if objective == "makespan":
+                candidates = np.maximum(best[:n, np.newaxis], costs)
+            else:
+                candidates = best[:n, np.newaxis] + costs
+            starts = np.argmin(candidates, axis=0)
+            best = np.concatenate([[np.inf], candidates[starts, np.arange(n)]])
+            layers.append(starts)
+            totals.append(best[n])
+        if np.isfinite(min(totals)):
+            break
+
+    routes, end = [], n
+    for starts in layers[:int(np.argmin(totals))][::-1]:
+        start = int(starts[end - 1])
+        routes.append(customers[start:end].tolist())
+        end = start
+    return routes[::-1] + [[] for _ in range(routeCount - len(routes))]
+
+
+def improve_route(matrix, route, begin):
+    """Улучшает порядок вершин одного маршрута begin -> route -> begin ходами 2-opt и Or-opt"""
+    if len(route) < 3:
+        return list(route)
+    nodes = np.array([begin] + list(route))
+    tour = improve_tour(matrix[np.ix_(nodes, nodes)], np.arange(nodes.size))
+    return nodes[tour[1:]].tolist()
+
+
+def improve_routes(matrix, routes, begin, limits, neighbours=None, objective="total"):
+    """Межмаршрутный локальный поиск: relocate, swap и 2-opt*, пока они улучшают решение
+
+    routes - списки вершин маршрутов без начальной вершины begin, limits - наибольшая длина каждого маршрута.
+    Решение сравнивается по каналам, как обходы в improve_tour: сначала суммарное превышение limits,
+    затем (при objective="makespan") длина самого длинного маршрута, затем сумма длин маршрутов.
+    neighbours - массив (n, K) ближайших соседей: ходы соединяют вершину только с её соседями.
+    Ходы внутри одного маршрута оставлены improve_tour.
+    """
+    search = _RouteSearch(matrix, routes, begin, limits, objective == "makespan")
+    if neighbours is None:
+        neighbours = nearest_neighbours(matrix, matrix.shape[0] - 1) if matrix.shape[0] > 1 \
+            else np.empty((matrix.shape[0], 0), dtype=np.int64)
+    improved = True
+    while improved:
+        improved = False
+        for v in [v for route in search.routes for v in route]:
+            for w in neighbours[v]:
+                if w != begin and search.route[w] != search.route[v] and search.tryMoves(v, int(w)):
+                    improved = True
+                    break
+            else:
+                improved = search.tryEmptyRoute(v) or improved
+    return search.routes
+
+
+class _RouteSearch:
+    """Маршруты с префиксными длинами для оценки ходов между двумя маршрутами за O(1)"""
+
+    def __init__(self, matrix, routes, begin, limits, makespan=False):
+        self.makespan = makespan
+        self.matrix = np.array(matrix, dtype=np.float64)
+        self.matrix[begin, begin] = 0  # пустой маршрут begin -> begin имеет длину 0
+        self.begin = begin
+        self.limits = np.asarray(limits, dtype=np.float64)
+        self.routes = [list(route) for route in routes]
+        self.route = {}
+        self.position = {}
+        self.nodes = [None] * len(self.routes)
+        self.prefix = [None] * len(self.routes)
+        for r in range(len(self.routes)):
+            self.__refresh(r)
+        self.__rankLengths()
+
+    def __refresh(self, r):
+        """Пересчитывает последовательность вершин, префиксные длины и положения вершин маршрута r"""
+        nodes = np.array([self.begin] + self.routes[r] + [self.begin], dtype=np.int64)
+        self.nodes[r] = nodes
+        self.prefix[r] = np.concatenate([[0], np.cumsum(self.matrix[nodes[:-1], nodes[1:]])])
+        for k, v in enumerate(self.routes[r]):
+            self.route[v], self.position[v] = r, k + 1  # номер в nodes
+
+    def __rankLengths(self):
+        """Три самых длинных маршрута - чтобы за O(1) знать самый длинный маршрут, кроме двух изменяемых"""
+        lengths = [(prefix[-1], r) for r, prefix in enumerate(self.prefix)]
+        self.longest = sorted(lengths, reverse=True)[:3]
+
+    def __longestExcept(self, a, b):
+        return next((length for length, r in self.longest if r != a and r != b), 0.0)
+
+    def __better(self, a, b, lengthA, lengthB):
+        """Улучшают ли новые длины маршрутов a и b решение (превышение limits, самый длинный маршрут, сумма длин)"""
+        oldA, oldB = self.prefix[a][-1], self.prefix[b][-1]
+        excess = self.__excess(a, lengthA) + self.__excess(b, lengthB)
+        oldExcess = self.__excess(a, oldA) + self.__excess(b, oldB)
+        if excess < oldExcess - EPSILON:
+            return True
+        if excess > oldExcess + EPSILON:
+            return False
+        if self.makespan:
+            others = self.__longestExcept(a, b)
+            longest, oldLongest = max(others, lengthA, lengthB), max(others, oldA, oldB)
+            if longest < oldLongest - EPSILON:
+                return True
+            if longest > oldLongest + EPSILON:
+                return False
+        return lengthA + lengthB < oldA + oldB - EPSILON
+
+    def __excess(self, r, length):
+        return max(0.0, length - self.limits[r])
+
+    def __apply(self, a, b, routeA, routeB):
+        self.routes[a], self.routes[b] = routeA, routeB
+        self.__refresh(a)
+        self.__refresh(b)
+        self.__rankLengths()
+
+    def tryEmptyRoute(self, v):
+        """Пробует перенести v в пустой маршрут (у пустых маршрутов нет вершин-соседей для tryMoves)"""
+        empty = [r for r, route in enumerate(self.routes) if not route]
+        if not empty:
+            return False
+        a, i = self.route[v], self.position[v]
+        nodesA = self.nodes[a]
+        withoutV = self.prefix[a][-1] - self.matrix[nodesA[i - 1], v] - self.matrix[v, nodesA[i + 1]] \
+            + self.matrix[nodesA[i - 1], nodesA[i + 1]]
+        alone = self.matrix[self.begin, v] + self.matrix[v, self.begin]
+        for b in empty:
+            if self.__better(a, b, withoutV, alone):
+                self.__apply(a, b, self.routes[a][:i - 1] + self.routes[a][i:], [v])
+                return True
+        return False
+
+    def tryMoves(self, v, w):
+        """Пробует ходы, ставящие v рядом с w (v и w - в разных маршрутах); применяет первый улучшающий"""
+        d = self.matrix
+        a, b = self.route[v], self.route[w]
+        nodesA, nodesB = self.nodes[a], self.nodes[b]
+        i, j = self.position[v], self.position[w]
+        lengthA, lengthB = self.prefix[a][-1], self.prefix[b][-1]
+        predV, succV = nodesA[i - 1], nodesA[i + 1]
+        predW, succW = nodesB[j - 1], nodesB[j + 1]
+        withoutV = lengthA - d[predV, v] - d[v, succV] + d[predV, succV]
+
+        # relocate: v переносится сразу после w или сразу перед w
+        newB = lengthB - d[w, succW] + d[w, v] + d[v, succW]
+        if self.__better(a, b, withoutV, newB):
+            routeB = self.routes[b][:j] + [v] + self.routes[b][j:]
+            self.__apply(a, b, self.routes[a][:i - 1] + self.routes[a][i:], routeB)
+            return True
+        newB = lengthB - d[predW, w] + d[predW, v] + d[v, w]
+        if self.__better(a, b, withoutV, newB):
+            routeB = self.routes[b][:j - 1] + [v] + self.routes[b][j - 1:]
+            self.__apply(a, b, self.routes[a][:i - 1] + self.routes[a][i:], routeB)
+            return True
+
+        # swap: v встаёт на место соседа w по маршруту (после w), а тот - на место v
+        if succW != self.begin:
+            x, k = succW, j + 1
+            predX, succX = w, nodesB[k + 1]
+            newA = lengthA - d[predV, v] - d[v, succV] + d[predV, x] + d[x, succV]
+            newB = lengthB - d[predX, x] - d[x, succX] + d[predX, v] + d[v, succX]
+            if self.__better(a, b, newA, newB):
+                routeA, routeB = list(self.routes[a]), list(self.routes[b])
+                routeA[i - 1], routeB[k - 1] = x, v
+                self.__apply(a, b, routeA, routeB)
+                return True
+
+        # 2-opt*: хвосты маршрутов меняются местами, появляется ребро v -> w
+        prefixA, prefixB = self.prefix[a], self.prefix[b]
+        newA = prefixA[i] + d[v, w] + (lengthB - prefixB[j])
+        newB = prefixB[j - 1] + d[predW, succV] + (lengthA - prefixA[i + 1])
+        if self.__better(a, b, newA, newB):
+            routeA = self.routes[a][:i] + self.routes[b][j - 1:]
+            routeB = self.routes[b][:j - 1] + self.routes[a][i:]
+            self.__apply(a, b, routeA, routeB)
+            return True
+        return False
@@ -1,5 +1,12 @@
 import numpy as np
+import heapq
+import itertools
 import logging
+import time
+
+from heuristics import nearest_neighbour_tour, improve_tour, tour_length, nearest_neighbours, double_bridge, \
+    split_tour, improve_routes, improve_route, route_length, EPSILON, OBJECTIVES
+from config import HEURISTIC_NEIGHBOURS, HELD_KARP_MAX_POINTS
 """
 Было использовано описание алгоритма Литтла из источника: https://habr.com/ru/post/332208/
 """
@@ -15,6 +22,17 @@ class LittleSolver:
         длина кратчайшего пути
     path : list
         список номеров вершин, обход которых в порядке того, как они лежат в этом списке, составляет кратчайший путь
+    gap : double
+        доказанный разрыв между record и нижней гранью (0, если перебор завершён и record оптимален;
+        np.inf, если лимит исчерпан раньше, чем найден первый обход)
+    strategy : str
+        порядок обхода дерева ветвлений: "depth" - в глубину, "best" - по наименьшей нижней грани
+    nodeLimit : int
+        максимальное число рассматриваемых вершин дерева (None - без ограничения)
+    timeLimit : double
+        ограничение времени работы solve в секундах (None - без ограничения)
+    warmStart : bool
+        перед перебором взять record и path из обхода ближайшим соседом, улучшенного 2-opt и Or-opt
     -------------
 
     Methods
@@ -25,19 +43,31 @@ class LittleSolver:
         Выполняет прогонку по строкам и столбцам и высчитывает нижнюю грань
     getCoefficient(Matrix, i, j)
         Высчитывает коэффициент для нуля данной матрицы, лежащего по i,j координате
-    pathGenerator(path, begin)
+    pathGenerator(path, begin, size=None)
         Принимает список ребёр из пути и превращает его в список вершин, начиная с begin
     getMaxCoeffElement(Matrix)
         Вычисляет нуль матрицы с максимальным коэффициентом
-    solve(Matrix, indexMatrix, path=None, bottomLimit=0)
-        Выполняет алгоритм Литтла и заполняет поля path (пока списком ребёр) и record
-    findPath(matrix, beginValue=0)
-        Главный метод, генерирующий матрицу индексов и возвращающий path и record
+    solve(matrix)
+        Выполняет алгоритм Литтла (без рекурсии, в одной рабочей матрице) и заполняет поля path (пока списком ребёр),
+        record и gap
+    isTour(edges, size)
+        Проверяет, что список рёбер образует один цикл через все вершины
+    extendMatrix(matrix, beginValue=0, planeCount=1)
+        Добавляет в матрицу копии начальной вершины для нескольких беспилотников
+    findPath(matrix, beginValue=0, planeCount=1)
+        Главный метод, запускающий solve и возвращающий path и record
     -------------
     """
-    def __init__(self):
+    def __init__(self, strategy="depth", nodeLimit=None, timeLimit=None, warmStart=False):
+        if strategy not in ("depth", "best"):
+            raise ValueError(f"Неизвестная стратегия обхода: {strategy}")
         self.record = np.inf
         self.path = []
+        self.gap = 0
+        self.strategy = strategy
+        self.nodeLimit = nodeLimit
+        self.timeLimit = timeLimit
+        self.warmStart = warmStart
 
     @staticmethod
     def pathLen(matrix, path, end):
@@ -150,116 +180,366 @@ class LittleSolver:
         return rmin + cmin if rmin + cmin != np.inf else 0
 
     @staticmethod
-    def pathGenerator(path, beginValues):
+    def pathGenerator(path, beginValues, size=None):
         """Принимает в себя path в виде списка ребёр, и строит из него путь в виде списка вершин, учитывая начальную вершину (begin)
 
+        Рёбра один раз раскладываются в массив последователей, поэтому каждый маршрут восстанавливается
+        за число его вершин. Пустой path (решение не найдено) даёт маршруты из одной начальной вершины.
+
         Arguments
         path : list
             Список ребёр пути
-        begin : int
-            Начальная вершина
+        beginValues : list
+            Начальная вершина и её копии (см. extendMatrix)
+        size : int
+            Число вершин задачи (размер расширенной матрицы); если задано, маршруты должны пройти их все
 
         Return
         Путь, состоящий из списка вершин, начиная с begin : list
+            Маршрут каждого беспилотника обрывается на первой встреченной копии начальной вершины
+
+        Raises
+        ValueError
+            Если из вершины выходит несколько рёбер, маршрут обрывается, рёбра образуют
+            цикл, не проходящий через начальную вершину, или маршруты проходят не все size вершин
         """
+        if len(path) == 0:
+            return [[beginValues[0]] for _ in beginValues]
+        edges = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+        vertexCount = max(edges.max(), max(beginValues)) + 1
+        if (np.bincount(edges[:, 0], minlength=vertexCount) > 1).any():
+            raise ValueError("Из одной вершины выходит несколько рёбер пути")
+        successor = np.full(vertexCount, -1, dtype=np.int64)
+        successor[edges[:, 0]] = edges[:, 1]
+        successor = successor.tolist()
+        isBegin = np.zeros(vertexCount, dtype=bool)
+        isBegin[beginValues] = True
+        isBegin = isBegin.tolist()
 
         genPaths = []
-
-        for i in beginValues:
-            genPath = []
-            genPath.append(beginValues[0])
-            pastNumber = i
-            flag = True
-
-            while pastNumber != i or flag:
-                flag = False
-                for way in path:
-                    if way[0] == pastNumber:
-                        nextNumber = way[1]
-                        if nextNumber == i:
-                            nextNumber = beginValues[0]
-                        genPath.append(nextNumber)
-                        pastNumber = way[1]
-                        break
+        visited = 0
+        for begin in beginValues:
+            genPath = [beginValues[0]]
+            vertex = successor[begin]
+            while True:
+                if vertex < 0:
+                    raise ValueError(f"Маршрут из вершины {begin} обрывается: нет ребра дальше")
+                visited += 1
+                if visited > len(edges):
+                    raise ValueError("Рёбра пути образуют цикл, не проходящий через начальную вершину")
+                if isBegin[vertex]:
+                    genPath.append(beginValues[0])
+                    break
+                genPath.append(vertex)
+                vertex = successor[vertex]
             genPaths.append(genPath)
-
+        if visited != len(edges):
+            raise ValueError("Часть вершин не попала в маршруты: рёбра пути образуют отдельный цикл")
+        if size is not None and visited != size:
+            raise ValueError(f"Маршруты проходят {visited} вершин из {size}")
         return genPaths
 
-    def getMaxCoeffElement(self, Matrix):
+    @staticmethod
+    def getMaxCoeffElement(Matrix):
         """Вычисляет коэфф. для каждого нуля, и выбирает нуль с максимальным
 
+        Коэффициенты всех нулей считаются одним векторным выражением: для нуля в (i, j) это сумма
+        второго минимума строки i и второго минимума столбца j (первый минимум - сам этот нуль).
+        Бесконечный коэффициент, как и в getCoefficient, считается нулевым.
+
         Arguments
         Matrix : np.array
-            Исходная матрица
+            Исходная (приведённая) матрица
 
         Return
         Номер строки нуля с максимальным коэффициентом : int
         Номер столбца нуля с максимальным коэффициентом : int
         """
-        coeffs = []
-        m = np.nonzero(Matrix == 0)
-        for i in range(m[0].size):
-            coeffs.append(self.getCoefficient(Matrix, m[0][i], m[1][i]))
+        zeroRows, zeroCols = np.nonzero(Matrix == 0)
+        rowSecondMin = np.partition(Matrix, 1, axis=1)[:, 1] if Matrix.shape[1] > 1 else np.full(Matrix.shape[0], np.inf)
+        colSecondMin = np.partition(Matrix, 1, axis=0)[1] if Matrix.shape[0] > 1 else np.full(Matrix.shape[1], np.inf)
 
-        coeffs = np.array(coeffs)
-        maxCoeff = np.max(coeffs)
-        maxNum = np.nonzero(coeffs == maxCoeff)[0][0]
+        coeffs = rowSecondMin[zeroRows] + colSecondMin[zeroCols]
+        coeffs[np.isinf(coeffs)] = 0
+        maxNum = np.argmax(coeffs)
 
-        return m[0][maxNum], m[1][maxNum]
+        return zeroRows[maxNum], zeroCols[maxNum]
 
-    def solve(self, Matrix, indexMatrix, path=None, bottomLimit=0):
-        """ Полностью выполняет алгоритм Литтла
+    def solve(self, matrix):
+        """ Полностью выполняет алгоритм Литтла и заполняет поля path (пока списком ребёр), record и gap
+
+        Вся работа ведётся в одной рабочей матрице: вместо удаления строк и столбцов используются маски
+        активных строк и столбцов, а сами выключенные строки и столбцы заполняются np.inf. При обходе
+        в глубину ветвление идёт по явному стеку задач, а приведение матрицы (обратным прибавлением
+        сохранённых минимумов строк и столбцов) и запреты рёбер откатываются при возврате из ветки.
+        При обходе "по лучшей границе" вершины хранятся в куче в виде списков включённых и запрещённых рёбер,
+        а матрица восстанавливается по ним.
+        Если исчерпан лимит вершин или времени, остаётся лучший найденный путь, а в gap - доказанный разрыв
+        между его длиной и нижней гранью всех неисследованных веток.
 
         Arguments
-        Matrix : np.array
+        matrix : np.array
             Матрица весов графа
-        indexMatrix : np.array
-            Матрица индексов элементов (нужна, чтобы знать координаты ребёр). Генерируется в findPath
-        path : list
-            Список уже пройденных ребёр
-        bottomLimit : int
-            Верхняя граница путей, нужная для отсеивания длинных путей
         """
-        if not path:
-            path = []
-
-        if Matrix.shape == (2, 2):  # Если осталась матрица размером 2Х2, то это конечный шаг. Проверяем, подходит ли она для кратчайшего пути, и загоняем оставшиеся рёбра в path
-            k = np.nonzero(Matrix != np.inf)
-            lastSteps = [Matrix[k[0][i]][k[1][i]] for i in range(k[0].size)]
-            bottomLimit += np.sum(lastSteps)
-            if self.record > bottomLimit:
-                self.record = bottomLimit
-            path.append(indexMatrix[k[0][0]][k[1][0]])
-            if len(k[0]) == 2:
-                path.append(indexMatrix[k[0][1]][k[1][1]])
-            self.path = path.copy()
+        n = matrix.shape[0]
+        self.__original = matrix
+        self.__work = np.array(matrix, dtype=np.float64)
+        self.__rows = np.ones(n, dtype=bool)  # активные строки (из вершины ещё не выходит ребро пути)
+        self.__cols = np.ones(n, dtype=bool)  # активные столбцы (в вершину ещё не входит ребро пути)
+        self.__chainStart = np.arange(n)  # начало цепочки рёбер пути, оканчивающейся в вершине
+        self.__chainEnd = np.arange(n)  # конец цепочки рёбер пути, начинающейся в вершине
+        self.__edges = []
+        self.__zeros = np.empty((n, n), dtype=bool)  # маска нулей при выборе нуля
+        self.__nodes = 0
+        self.__deadline = None if self.timeLimit is None else time.monotonic() + self.timeLimit
+
+        if self.strategy == "best":
+            lowerBound = self.__bestFirst()
+        else:
+            lowerBound = self.__depthFirst()
+        if self.record == np.inf:
+            # обход не найден: при исчерпанном лимите разрыв не определён, иначе обхода нет вовсе
+            self.gap = np.inf if lowerBound < np.inf else 0
+        else:
+            self.gap = max(self.record - lowerBound, 0) if lowerBound < self.record else 0
+
+    def __budgetExhausted(self):
+        return (self.nodeLimit is not None and self.__nodes >= self.nodeLimit) \
+               or (self.__deadline is not None and time.monotonic() > self.__deadline)
+
+    def __depthFirst(self):
+        """Обход дерева ветвлений в глубину. Возвращает нижнюю грань неисследованных веток (record, если их нет)"""
+        self.__stack = [(self.__visit, 0)]
+        while self.__stack:
+            if self.__budgetExhausted():
+                branches = (self.__visit, self.__include, self.__exclude)
+                return min([args[-1] for task, *args in self.__stack if task in branches], default=self.record)
+            task, *args = self.__stack.pop()
+            task(*args)
+        return self.record
+
+    def __bestFirst(self):
+        """Обход дерева ветвлений по наименьшей нижней грани. Возвращает нижнюю грань неисследованных веток"""
+        heap = [(0, 0, (), ())]
+        counter = itertools.count(1)
+        while heap and heap[0][0] <= self.record:
+            if self.__budgetExhausted():
+                return heap[0][0]
+            _, _, included, excluded = heapq.heappop(heap)
+            self.__nodes += 1
+            self.__restore(included, excluded)
+            if np.count_nonzero(self.__rows) <= 2:
+                self.__finish()
+                continue
+
+            reduction = self.__reduce()
+            if reduction is None:
+                continue
+            rowMin, colMin = reduction
+            bottomLimit = sum(self.__original[i][j] for i, j in included) + np.sum(rowMin) + np.sum(colMin)
+            if bottomLimit > self.record:
+                continue
+            i, j, coeff = self.__maxCoeffZero()
+            heapq.heappush(heap, (bottomLimit, next(counter), included + ((i, j),), excluded))
+            heapq.heappush(heap, (bottomLimit + coeff, next(counter), included, excluded + ((i, j),)))
+        return self.record
+
+    def __restore(self, included, excluded):
+        """Восстанавливает рабочую матрицу для вершины с включёнными рёбрами included и запрещёнными excluded"""
+        np.copyto(self.__work, self.__original)
+        self.__rows[:] = True
+        self.__cols[:] = True
+        self.__chainStart[:] = np.arange(self.__chainStart.size)
+        self.__chainEnd[:] = np.arange(self.__chainEnd.size)
+        self.__edges = []
+        for i, j in excluded:
+            self.__work[i, j] = np.inf
+        for i, j in included:
+            self.__applyInclude(i, j)
+
+    def __visit(self, bottomLimit):
+        """Обрабатывает вершину дерева ветвлений: приводит матрицу и кладёт в стек обе ветки и их откат"""
+        self.__nodes += 1
+        if np.count_nonzero(self.__rows) <= 2:  # Осталась матрица 2Х2 - конечный шаг
+            self.__finish()
             return
 
-        addBottomLimit, newMatrix = self.substractFromMatrix(Matrix)  #  Преобразовываем матрицу, и высчитываем среднюю грань для неё
-        bottomLimit += addBottomLimit
+        reduction = self.__reduce()  # Приводим матрицу и высчитываем нижнюю грань для неё
+        if reduction is None:
+            return
+        rowMin, colMin = reduction
+        self.__stack.append((self.__unreduce, rowMin, colMin))
+        bottomLimit += np.sum(rowMin) + np.sum(colMin)
         if bottomLimit > self.record:
             return
 
-        i, j = self.getMaxCoeffElement(newMatrix)  # Вычисляем координаты нуля с максимальным коэфф., и добавляем их в новый путь
-        newPath = path.copy()
-        newPath.append(indexMatrix[i][j])
+        i, j, _ = self.__maxCoeffZero()  # Нуль с максимальным коэфф. - ребро, по которому ветвимся
+        # Стек обратный: сначала ветка с ребром (i, j) в пути, затем ветка без него
+        self.__stack.append((self.__exclude, i, j, bottomLimit))
+        self.__stack.append((self.__include, i, j, bottomLimit))
 
-        M1 = newMatrix.copy()  #  Раздваиваем поиск на две матрицы: Там, где мы добавили ребро в путь, и там где убрали (М1 и М2). Здесь определили М1
-        indexM1 = indexMatrix.copy()
-        indexM1 = np.delete(indexM1, i, 0)
-        indexM1 = np.delete(indexM1, j, 1)
-        M1 = np.delete(M1, i, 0)
-        M1 = np.delete(M1, j, 1)
-        M1 = self.setInf(M1)
+    def __reduce(self):
+        """Прогонка рабочей матрицы на месте. None, если путь невозможен
 
-        M2 = newMatrix.copy()  # Здесь определили М2
-        M2[i][j] = np.Inf
+        Возвращает минимумы строк и столбцов - всё, что нужно __unreduce. Выключенные строки и столбцы
+        заполнены np.inf (см. __applyInclude) и не меняются, а INFINITY в активной части после вычитания
+        и прибавления минимума возвращается точно: малый минимум теряется в округлении 1e32 в обе стороны,
+        а минимум порядка INFINITY вычитается без погрешности.
+        """
+        work = self.__work
+        rowMin = work.min(axis=1)
+        rowMin[~self.__rows] = 0
+        if np.isinf(rowMin).any():
+            return None
+        work -= rowMin[:, np.newaxis]
+
+        colMin = work.min(axis=0)
+        colMin[~self.__cols] = 0
+        if np.isinf(colMin).any():
+            work += rowMin[:, np.newaxis]
+            return None
+        work -= colMin
+        return rowMin, colMin
+
+    def __unreduce(self, rowMin, colMin):
+        """Прибавляет обратно минимумы, вычтенные __reduce"""
+        self.__work += colMin
+        self.__work += rowMin[:, np.newaxis]
+
+    def __maxCoeffZero(self):
+        """Нуль активной части матрицы с максимальным коэффициентом (в номерах исходной матрицы) и сам коэффициент
+
+        Считается прямо по рабочей матрице, как в getMaxCoeffElement: коэффициент нуля - сумма вторых минимумов
+        его строки и столбца. Нули на время поиска вторых минимумов заменяются на np.inf, а строкам и
+        столбцам с несколькими нулями второй минимум - нуль.
+        """
+        work, n = self.__work, self.__work.shape[0]
+        zeroRows, zeroCols = np.nonzero(np.equal(work, 0, out=self.__zeros))
+        work[zeroRows, zeroCols] = np.inf
+        rowSecondMin = work.min(axis=1)
+        colSecondMin = work.min(axis=0)
+        work[zeroRows, zeroCols] = 0
+        rowSecondMin[np.bincount(zeroRows, minlength=n) > 1] = 0
+        colSecondMin[np.bincount(zeroCols, minlength=n) > 1] = 0
+
+        coeffs = rowSecondMin[zeroRows] + colSecondMin[zeroCols]
+        coeffs[np.isinf(coeffs)] = 0
+        maxNum = np.argmax(coeffs)
+        return zeroRows[maxNum], zeroCols[maxNum], coeffs[maxNum]
+
+    def __applyInclude(self, i, j):
+        """Включает ребро (i, j) в путь: строка i и столбец j выключаются, замыкание цепочки запрещается
+
+        Выключенные строка и столбец заполняются np.inf, их прежние значения сохраняются для __uninclude.
+        """
+        head = self.__chainStart[i]
+        tail = self.__chainEnd[j]
+        saved = (self.__chainEnd[head], self.__chainStart[tail], self.__work[tail, head],
+                 self.__work[i].copy(), self.__work[:, j].copy())
+        self.__chainEnd[head] = tail
+        self.__chainStart[tail] = head
+        self.__work[tail, head] = np.inf
+        self.__work[i] = np.inf
+        self.__work[:, j] = np.inf
+        self.__rows[i] = False
+        self.__cols[j] = False
+        self.__edges.append((i, j))
+        return head, tail, saved
+
+    def __include(self, i, j, bottomLimit):
+        """Ветка, где ребро (i, j) входит в путь"""
+        self.__stack.append((self.__uninclude, i, j, *self.__applyInclude(i, j)))
+        self.__stack.append((self.__visit, bottomLimit))
+
+    def __uninclude(self, i, j, head, tail, saved):
+        self.__edges.pop()
+        self.__rows[i] = True
+        self.__cols[j] = True
+        self.__chainEnd[head], self.__chainStart[tail], self.__work[tail, head], row, col = saved
+        self.__work[:, j] = col
+        self.__work[i] = row
+
+    def __exclude(self, i, j, bottomLimit):
+        """Ветка, где ребро (i, j) запрещено"""
+        self.__stack.append((self.__unexclude, i, j, self.__work[i, j]))
+        self.__work[i, j] = np.inf
+        self.__stack.append((self.__visit, bottomLimit))
+
+    def __unexclude(self, i, j, saved):
+        self.__work[i, j] = saved
+
+    def __finish(self):
+        """Конечный шаг: дополняет путь оставшимися рёбрами и, если получился обход, обновляет record и path"""
+        rows = np.flatnonzero(self.__rows)
+        best, bestEdges = np.inf, None
+        for cols in itertools.permutations(np.flatnonzero(self.__cols)):
+            lastSteps = list(zip(rows, cols))
+            if any(self.__work[r, c] == np.inf for r, c in lastSteps):
+                continue
+            edges = self.__edges + lastSteps
+            length = sum(self.__original[r][c] for r, c in edges)
+            if length < best and self.isTour(edges, self.__original.shape[0]):
+                best, bestEdges = length, edges
+        if bestEdges is not None and best <= self.record:
+            self.record = best
+            self.path = [(int(r), int(c)) for r, c in bestEdges]
+
+    @staticmethod
+    def isTour(edges, size):
+        """Проверяет, что рёбра edges образуют один цикл через все size вершин"""
+        successor = np.full(size, -1)
+        for i, j in edges:
+            successor[i] = j
+        if len(edges) != size or (successor < 0).any():
+            return False
+        vertex, visited = 0, 0
+        while True:
+            vertex = successor[vertex]
+            visited += 1
+            if vertex == 0:
+                return visited == size
 
-        self.solve(M1, indexM1, newPath, bottomLimit) # Запускаем рекурсию по двум новым путям
-        self.solve(M2, indexMatrix, path, bottomLimit)
+    @staticmethod
+    def extendMatrix(matrix, beginValue=0, planeCount=1):
+        """Добавляет в матрицу planeCount - 1 копий начальной вершины, сводя задачу нескольких беспилотников к одному обходу
+
+        Arguments
+        matrix : np.array
+            Матрица весов графа
+        beginValue : int
+            Начальная вершина
+        planeCount : int
+            Количество беспилотников
+
+        Return
+        newMatrix : np.array
+            Расширенная матрица (копии начальной вершины - последние строки и столбцы)
+        beginValues : list
+            Начальная вершина и номера её копий
+        """
+        size = matrix.shape[0]
+        newMatrix = np.full(shape=(size + planeCount - 1, size + planeCount - 1), fill_value=np.inf)
+        newMatrix[:size, :size] = matrix
+        newMatrix[:size, size:] = matrix[:, beginValue][:, np.newaxis]
+        newMatrix[size:, :size] = matrix[beginValue]
+        beginValues = [beginValue] + list(range(size, size + planeCount - 1))
+        return newMatrix, beginValues
+
+    def __warmStart(self, matrix, beginValue):
+        """Начальная верхняя граница: обход ближайшим соседом, улучшенный 2-opt и Or-opt
+
+        С конечным record отсечение в solve работает с первой же вершины дерева, а не после первого спуска до листа.
+        """
+        tour = improve_tour(matrix, nearest_neighbour_tour(matrix, beginValue))
+        length = tour_length(matrix, tour)
+        if length < np.inf:
+            self.record = length
+            self.path = [(int(i), int(j)) for i, j in zip(tour, np.roll(tour, -1))]
+            logging.info(f'Начальная верхняя граница: {length}')
 
     def findPath(self, matrix, beginValue = 0, planeCount=1):
-        """ Главный метод. Генерирует матрицу индексов, и запускает solve. Возвращает path и record.
+        """ Главный метод. Расширяет матрицу копиями начальной вершины и запускает solve. Возвращает path и record.
+        Минимизируется суммарная длина маршрутов; цель makespan поддерживают только HeuristicSolver и FleetSolver.
 
         Arguments
         matrix : np.array
@@ -271,30 +551,26 @@ class LittleSolver:
 
         Return
         path : list
-            Кратчайший путь, являющийся списком вершин
+            Кратчайший путь, являющийся списком вершин; пустой список, если обход не найден
+            (обхода нет или лимит вершин или времени исчерпан раньше, чем найден первый обход)
         record : int
-            Длина кратчайшего пути
+            Длина кратчайшего пути; np.inf, если обход не найден
         """
         logging.info('Алгоритм начал работу')
 
-        newMatrix = np.full(shape=(matrix.shape[0]+planeCount - 1, matrix.shape[1]+planeCount - 1), fill_value=np.inf)
-        for i in range(matrix.shape[0]):
-            for j in range(matrix.shape[0]):
-                newMatrix[i][j] = matrix[i][j]
-        for i in range(matrix.shape[0]):
-            for j in range(matrix.shape[0], newMatrix.shape[0]):
-                if matrix[i][beginValue] != np.inf:
-                    newMatrix[i][j] = matrix[i][beginValue]
-        for i in range(matrix.shape[0], newMatrix.shape[0]):
-            for j in range(matrix.shape[0]):
-                newMatrix[i][j] = matrix[beginValue][j]
+        newMatrix, beginValues = self.extendMatrix(matrix, beginValue, planeCount)
         self.record = np.inf
         self.path = []
-        indexMatrix = np.array([[[i, j] for j in range(newMatrix.shape[0])] for i in range(newMatrix.shape[1])])
-        self.solve(newMatrix, indexMatrix)
-        beginValues = [i for i in range(matrix.shape[0], matrix.shape[0] + planeCount - 1)]
-        beginValues.insert(0, beginValue)
-        self.path = self.pathGenerator(self.path, beginValues)
+        if self.warmStart:
+            self.__warmStart(newMatrix, beginValue)
+        self.solve(newMatrix)
+        if self.gap > 0:
+            logging.info(f'Перебор остановлен по лимиту, разрыв с нижней гранью: {self.gap}')
+        if self.record == np.inf:
+            logging.info('Обход не найден')
+            self.path = []
+            return self.path, self.record
+        self.path = self.pathGenerator(self.path, beginValues, newMatrix.shape[0])
 
         #for i in range(matrix.shape[0]):
             #if i in points:
@@ -306,4 +582,231 @@ class LittleSolver:
         return self.path, self.record
 
 
+class HeuristicSolver:
+    """ Класс, реализующий приближённое решение задачи Коммивояжёра для больших заданий
+
+    Обход строится методом ближайшего соседа и улучшается ходами 2-opt и Or-opt, которые для каждой вершины
+    проверяют только её ближайших соседей. Перезапуски возмущают лучший обход ходом double-bridge
+    и снова улучшают его. Контракт findPath тот же, что у LittleSolver.
+
+    Attributes
+    -------------
+    record : double
+        длина найденного пути
+    path : list
+        маршруты беспилотников - списки вершин, начинающиеся и оканчивающиеся начальной вершиной
+    neighbourCount : int
+        сколько ближайших соседей вершины рассматривается в ходах
+    restarts : int
+        число перезапусков с возмущением
+    seed : int
+        зерно генератора случайных чисел для перезапусков
+    maxRounds : int
+        наибольшее число чередований ходов между маршрутами и внутри маршрутов при objective="makespan"
+    objective : str
+        "total" - минимизировать сумму длин маршрутов; "makespan" - длину самого длинного маршрута:
+        обход расширенной матрицы заново делится на planeCount маршрутов с наименьшим самым длинным
+        и они выравниваются ходами между маршрутами (record - длина самого длинного маршрута).
+        LittleSolver и HeldKarpSolver цель makespan не поддерживают
+    -------------
+    """
+    def __init__(self, neighbourCount=HEURISTIC_NEIGHBOURS, restarts=0, seed=None, maxRounds=10, objective="total"):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Неизвестная цель: {objective}")
+        self.record = np.inf
+        self.path = []
+        self.neighbourCount = neighbourCount
+        self.restarts = restarts
+        self.seed = seed
+        self.maxRounds = maxRounds
+        self.objective = objective
+
+    def findPath(self, matrix, beginValue=0, planeCount=1):
+        """ Главный метод. Возвращает path и record (см. LittleSolver.findPath)"""
+        logging.info('Эвристика начала работу')
+        newMatrix, beginValues = LittleSolver.extendMatrix(matrix, beginValue, planeCount)
+        neighbours = nearest_neighbours(newMatrix, self.neighbourCount) if newMatrix.shape[0] > 1 else None
+
+        tour = improve_tour(newMatrix, nearest_neighbour_tour(newMatrix, beginValue), neighbours)
+        self.record = tour_length(newMatrix, tour)
+        rng = np.random.default_rng(self.seed)
+        for _ in range(self.restarts):
+            candidate = improve_tour(newMatrix, double_bridge(tour, rng), neighbours)
+            length = tour_length(newMatrix, candidate)
+            if length < self.record:
+                tour, self.record = candidate, length
+
+        edges = list(zip(tour.tolist(), np.roll(tour, -1).tolist()))
+        self.path = LittleSolver.pathGenerator(edges, beginValues, newMatrix.shape[0])
+        if self.objective == "makespan" and planeCount > 1:
+            self.__balance(np.asarray(matrix, dtype=np.float64), beginValue, planeCount)
+        logging.info('Эвристика успешно завершилась')
+        return self.path, self.record
+
+    def __balance(self, matrix, beginValue, planeCount):
+        """Перестраивает маршруты path под цель makespan: деление общего обхода и выравнивание маршрутов"""
+        order = [beginValue] + [v for route in self.path for v in route[1:-1]]
+        routes = split_tour(matrix, order, planeCount, objective="makespan")
+        neighbours = nearest_neighbours(matrix, self.neighbourCount) if matrix.shape[0] > 1 else None
+        limits = np.full(planeCount, np.inf)
+        for _ in range(self.maxRounds):
+            before = [list(route) for route in routes]
+            routes = improve_routes(matrix, routes, beginValue, limits, neighbours, objective="makespan")
+            routes = [improve_route(matrix, route, beginValue) for route in routes]
+            if routes == before:
+                break
+        self.path = [[beginValue] + route + [beginValue] for route in routes]
+        self.record = max(route_length(matrix, route, beginValue) for route in routes)
+
+
+class HeldKarpSolver:
+    """ Класс, реализующий точное решение задачи Коммивояжёра динамическим программированием Хелда-Карпа
+
+    Таблица dp[S, j] - длина кратчайшего пути из начальной вершины через множество вершин S (битовая маска),
+    оканчивающегося в j. Таблица заполняется слоями по размеру S векторными операциями NumPy, поэтому время
+    работы O(2^n * n^2) и память O(2^n * n) зависят только от числа вершин, а не от весов матрицы.
+    Контракт findPath тот же, что у LittleSolver.
+
+    Attributes
+    -------------
+    record : double
+        длина кратчайшего пути
+    path : list
+        маршруты беспилотников - списки вершин, начинающиеся и оканчивающиеся начальной вершиной
+    maxPoints : int
+        наибольшее число вершин расширенной матрицы, для которого разрешён запуск
+    -------------
+    """
+    def __init__(self, maxPoints=HELD_KARP_MAX_POINTS):
+        self.record = np.inf
+        self.path = []
+        self.maxPoints = maxPoints
+
+    def findPath(self, matrix, beginValue=0, planeCount=1):
+        """ Главный метод. Возвращает path и record (см. LittleSolver.findPath)"""
+        newMatrix, beginValues = LittleSolver.extendMatrix(matrix, beginValue, planeCount)
+        if newMatrix.shape[0] > self.maxPoints:
+            raise ValueError(f"Хелд-Карп рассчитан не более чем на {self.maxPoints} вершин, "
+                             f"а в задаче {newMatrix.shape[0]}")
+        logging.info('Алгоритм Хелда-Карпа начал работу')
+        tour, self.record = self.solve(newMatrix, beginValue)
+        edges = list(zip(tour, tour[1:] + tour[:1])) if self.record < np.inf else []
+        self.path = LittleSolver.pathGenerator(edges, beginValues, newMatrix.shape[0])
+        logging.info('Алгоритм Хелда-Карпа успешно завершился')
+        return self.path, self.record
+
+    @staticmethod
+    def solve(matrix, begin=0):
+        """Кратчайший обход матрицы matrix из вершины begin. Возвращает список вершин обхода и его длину"""
+        others = np.array([v for v in range(matrix.shape[0]) if v != begin], dtype=np.int64)
+        k = others.size
+        if k == 0:
+            return [begin], 0
+        cost = matrix[np.ix_(others, others)]
+        masks = np.arange(1 << k, dtype=np.int64)
+        sizes = np.zeros(masks.size, dtype=np.int64)
+        for bit in range(k):
+            sizes += (masks >> bit) & 1
+
+        dp = np.full((masks.size, k), np.inf)
+        parent = np.full((masks.size, k), -1, dtype=np.int8 if k < 128 else np.int64)
+        dp[1 << np.arange(k), np.arange(k)] = matrix[begin, others]
+        for size in range(2, k + 1):
+            layer = masks[sizes == size]
+            for j in range(k):
+                subsets = layer[(layer >> j) & 1 == 1]
+                candidates = dp[subsets ^ (1 << j)] + cost[:, j]  # путь до i, затем ребро (i, j)
+                parent[subsets, j] = np.argmin(candidates, axis=1)
+                dp[subsets, j] = candidates[np.arange(subsets.size), parent[subsets, j]]
+
+        full = masks[-1]
+        closing = dp[full] + matrix[others, begin]
+        last = int(np.argmin(closing))
+        record = closing[last]
+
+        order = []
+        mask = full
+        while last >= 0:
+            order.append(int(others[last]))
+            mask, last = mask ^ (1 << last), (int(parent[mask, last]) if mask & (mask - 1) else -1)
+        return [begin] + order[::-1], record
+
+
+class FleetSolver:
+    """ Класс, реализующий приближённое решение задачи нескольких беспилотников (mTSP) без копий начальной вершины
+
+    Сначала строится один общий обход (ближайший сосед, 2-opt, Or-opt), затем он разбивается на маршруты
+    динамическим программированием (route-first, cluster-second). После этого маршруты улучшаются
+    ходами между маршрутами (relocate, swap, 2-opt*) и ходами внутри маршрутов, пока те дают улучшение.
+    Беспилотник может остаться на базе - его маршрут [beginValue, beginValue]. Контракт findPath тот же,
+    что у LittleSolver.
+
+    Attributes
+    -------------
+    record : double
+        суммарная длина маршрутов или, при objective="makespan", длина самого длинного маршрута
+    path : list
+        маршруты беспилотников - списки вершин, начинающиеся и оканчивающиеся начальной вершиной
+    ranges : double или list
+        наибольшая длина маршрута - одна на все беспилотники или своя для каждого (None - без ограничения)
+    feasible : bool
+        все ли маршруты найденного решения укладываются в ranges
+    neighbourCount : int
+        сколько ближайших соседей вершины рассматривается в ходах
+    maxRounds : int
+        наибольшее число чередований ходов между маршрутами и внутри маршрутов
+    objective : str
+        "total" - минимизировать сумму длин маршрутов, "makespan" - длину самого длинного маршрута
+        (время выполнения задания), при равенстве - сумму длин
+    -------------
+    """
+    def __init__(self, ranges=None, neighbourCount=HEURISTIC_NEIGHBOURS, maxRounds=10, objective="total"):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Неизвестная цель: {objective}")
+        self.record = np.inf
+        self.path = []
+        self.ranges = ranges
+        self.feasible = True
+        self.neighbourCount = neighbourCount
+        self.maxRounds = maxRounds
+        self.objective = objective
+
+    def findPath(self, matrix, beginValue=0, planeCount=1):
+        """ Главный метод. Возвращает path и record (см. LittleSolver.findPath)"""
+        logging.info('Алгоритм для нескольких беспилотников начал работу')
+        matrix = np.asarray(matrix, dtype=np.float64)
+        limits = self.__limits(planeCount)
+        neighbours = nearest_neighbours(matrix, self.neighbourCount) if matrix.shape[0] > 1 else None
+
+        tour = improve_tour(matrix, nearest_neighbour_tour(matrix, beginValue), neighbours)
+        routes = split_tour(matrix, tour, planeCount, limits.max(), self.objective)
+        # самые длинные маршруты - беспилотникам с наибольшей дальностью
+        order = np.argsort([-route_length(matrix, route, beginValue) for route in routes], kind="stable")
+        drones = np.argsort(-limits, kind="stable")
+        assigned = [None] * planeCount
+        for route, drone in zip(order, drones):
+            assigned[drone] = routes[route]
+        routes = assigned
+
+        for _ in range(self.maxRounds):
+            before = [list(route) for route in routes]
+            routes = improve_routes(matrix, routes, beginValue, limits, neighbours, self.objective)
+            routes = [improve_route(matrix, route, beginValue) for route in routes]
+            if routes == before:
+                break
+
+        lengths = np.array([route_length(matrix, route, beginValue) for route in routes])
+        self.feasible = bool((lengths <= limits + EPSILON).all())
+        if not self.feasible:
+            logging.info(f'Маршруты не укладываются в дальность беспилотников: {lengths.tolist()}')
+        self.record = lengths.max() if self.objective == "makespan" else lengths.sum()
+        self.path = [[beginValue] + list(route) + [beginValue] for route in routes]
+        logging.info('Алгоритм для нескольких беспилотников успешно завершился')
+        return self.path, self.record
 
+    def __limits(self, planeCount):
+        """Дальность каждого беспилотника, shape (planeCount,)"""
+        if self.ranges is None:
+            return np.full(planeCount, np.inf)
+        limits = np.broadcast_to(np.asarray(self.ranges, dtype=np.float64), (planeCount,))
+        return np.array(limits)
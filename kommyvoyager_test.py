@@ -1,5 +1,8 @@
+import itertools
 import numpy as np
-from kommivoyager import LittleSolver
+import pytest
+from kommivoyager import LittleSolver, HeuristicSolver, HeldKarpSolver, FleetSolver
+from config import INFINITY
 
 
 def test_kommyvoyager():
@@ -77,6 +80,26 @@ def test_pathGenerator():
     test_begin = [2]
     result = [[2, 3, 4, 5, 6, 0, 1, 2]]
     assert L.pathGenerator(test_path, test_begin) == result
+    assert L.pathGenerator([(0, 3), (3, 1), (1, 0), (4, 2), (2, 0)], [0, 4]) == [[0, 3, 1, 0], [0, 2, 0]]
+    assert L.pathGenerator([], [0, 4]) == [[0], [0]]
+
+
+def test_pathGenerator_reports_broken_paths():
+    L = LittleSolver()
+    broken = [[(0, 1), (1, 0), (2, 3), (3, 2)],  # отдельный цикл 2 - 3
+              [(0, 1), (1, 2)],  # маршрут обрывается
+              [(1, 2), (2, 1), (0, 3), (3, 4)],  # начальная вершина ведёт в обрыв
+              [(0, 1), (0, 2), (1, 0), (2, 0)]]  # два ребра из вершины 0
+    for path in broken:
+        with pytest.raises(ValueError):
+            L.pathGenerator(path, [0])
+    with pytest.raises(ValueError):
+        L.pathGenerator([(0, 1), (1, 0)], [0], 3)  # вершина 2 без рёбер
+    assert L.pathGenerator([(0, 2), (2, 1), (1, 0)], [0], 3) == [[0, 2, 1, 0]]
+
+    tour = np.random.default_rng(15).permutation(np.arange(1, 100000)).tolist()
+    edges = list(zip([0] + tour, tour + [0]))
+    assert L.pathGenerator(edges, [0]) == [[0] + tour + [0]]
 
 
 def test_getMaxCoeffElement():
@@ -108,3 +131,201 @@ def test_TSP():
     assert(path == result)
 
 
+
+
+def test_getMaxCoeffElement_matches_getCoefficient():
+    L = LittleSolver()
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        n = rng.integers(2, 9)
+        m = rng.integers(0, 4, (n, n)).astype(float)
+        m[rng.random((n, n)) < 0.2] = np.inf
+        m[rng.integers(n), rng.integers(n)] = 0
+        zeros = np.nonzero(m == 0)
+        coeffs = [L.getCoefficient(m, i, j) for i, j in zip(*zeros)]
+        k = int(np.argmax(coeffs))
+        assert L.getMaxCoeffElement(m) == (zeros[0][k], zeros[1][k])
+
+
+def test_best_first_strategy():
+    rng = np.random.default_rng(4)
+    for _ in range(10):
+        points = rng.uniform(0, 100, (9, 2))
+        matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+        np.fill_diagonal(matrix, np.inf)
+        _, depthRecord = LittleSolver().findPath(matrix)
+        L = LittleSolver(strategy="best")
+        path, record = L.findPath(matrix)
+        assert np.isclose(record, depthRecord)
+        assert L.gap == 0
+        assert sorted(path[0][:-1]) == list(range(9))
+
+
+def test_node_limit():
+    rng = np.random.default_rng(5)
+    points = rng.uniform(0, 100, (14, 2))
+    matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+    np.fill_diagonal(matrix, np.inf)
+    _, optimum = LittleSolver().findPath(matrix)
+    for strategy in ("depth", "best"):
+        L = LittleSolver(strategy=strategy, nodeLimit=20)
+        path, record = L.findPath(matrix)
+        assert L.gap > 0
+        if record < np.inf:
+            assert record >= optimum - 1e-9
+            assert record - L.gap <= optimum + 1e-9
+            assert sorted(path[0][:-1]) == list(range(14))
+
+
+def test_warm_start():
+    rng = np.random.default_rng(6)
+    for planeCount in (1, 2):
+        points = rng.uniform(0, 100, (10, 2))
+        matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+        np.fill_diagonal(matrix, np.inf)
+        _, record = LittleSolver().findPath(matrix, planeCount=planeCount)
+        path, warmRecord = LittleSolver(warmStart=True).findPath(matrix, planeCount=planeCount)
+        assert np.isclose(record, warmRecord)
+        assert sorted(sum((p[1:-1] for p in path), [])) == list(range(1, 10))
+
+
+def test_heuristic_solver():
+    rng = np.random.default_rng(7)
+    points = rng.uniform(0, 100, (9, 2))
+    matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+    np.fill_diagonal(matrix, np.inf)
+    for planeCount in (1, 3):
+        _, optimum = LittleSolver().findPath(matrix, planeCount=planeCount)
+        path, record = HeuristicSolver(restarts=5, seed=0).findPath(matrix, planeCount=planeCount)
+        assert len(path) == planeCount
+        assert all(p[0] == 0 and p[-1] == 0 for p in path)
+        assert sorted(sum((p[1:-1] for p in path), [])) == list(range(1, 9))
+        assert optimum - 1e-9 <= record <= 1.2 * optimum
+
+    L = HeuristicSolver()
+    tests_answer = L.findPath(np.array([[np.inf, 15, 40],
+                                        [43, np.inf, 4],
+                                        [30, 5, np.inf]]))
+    assert tests_answer == ([[0, 1, 2, 0]], 49)
+
+
+def test_held_karp():
+    H = HeldKarpSolver()
+    tests = [np.array([[np.inf, 43, 22, 14],
+                       [15, np.inf, 53, 2],
+                       [23, 10, np.inf, 4],
+                       [21, 67, 6, np.inf]]),
+             np.full((7, 7), 5.0) + np.diag(np.full(7, np.inf))]
+    test_answers = [45, 35]
+    for matrix, answer in zip(tests, test_answers):
+        path, record = H.findPath(matrix)
+        assert record == answer
+        assert sorted(path[0][:-1]) == list(range(matrix.shape[0]))
+
+    rng = np.random.default_rng(8)
+    points = rng.uniform(0, 100, (8, 2))
+    matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+    np.fill_diagonal(matrix, np.inf)
+    for planeCount in (1, 2, 3):
+        _, littleRecord = LittleSolver().findPath(matrix, planeCount=planeCount)
+        path, record = H.findPath(matrix, planeCount=planeCount)
+        assert np.isclose(record, littleRecord)
+        assert len(path) == planeCount
+
+
+def test_held_karp_size_limit():
+    with pytest.raises(ValueError):
+        HeldKarpSolver(maxPoints=5).findPath(np.ones((6, 6)))
+
+
+def test_fleet_solver():
+    rng = np.random.default_rng(9)
+    points = rng.uniform(0, 100, (9, 2))
+    matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+    np.fill_diagonal(matrix, np.inf)
+    _, optimum = LittleSolver().findPath(matrix)
+    path, record = FleetSolver().findPath(matrix)
+    assert len(path) == 1 and path[0][0] == path[0][-1] == 0
+    assert optimum - 1e-9 <= record <= 1.2 * optimum
+
+    ranges = [210, 250, 300]
+    solver = FleetSolver(ranges=ranges)
+    path, record = solver.findPath(matrix, planeCount=3)
+    assert solver.feasible
+    assert sorted(sum((p[1:-1] for p in path), [])) == list(range(1, 9))
+    lengths = [sum(matrix[a, b] for a, b in zip(p, p[1:])) if len(p) > 2 else 0 for p in path]
+    assert all(length <= limit + 1e-9 for length, limit in zip(lengths, ranges))
+    assert np.isclose(record, sum(lengths))
+
+
+def test_fleet_solver_scales():
+    rng = np.random.default_rng(10)
+    points = rng.uniform(0, 1000, (300, 2))
+    matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+    np.fill_diagonal(matrix, np.inf)
+    solver = FleetSolver(ranges=2500)
+    path, record = solver.findPath(matrix, planeCount=20)
+    assert solver.feasible and len(path) == 20
+    assert sorted(sum((p[1:-1] for p in path), [])) == list(range(1, 300))
+
+
+def test_makespan_objective():
+    rng = np.random.default_rng(13)
+    points = rng.uniform(0, 100, (40, 2))
+    matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+    np.fill_diagonal(matrix, np.inf)
+
+    def lengths(path):
+        return [sum(matrix[a, b] for a, b in zip(p, p[1:])) if len(p) > 2 else 0 for p in path]
+
+    for total, makespan in ((HeuristicSolver(), HeuristicSolver(objective="makespan")),
+                            (FleetSolver(), FleetSolver(objective="makespan"))):
+        path, _ = total.findPath(matrix, planeCount=4)
+        balanced, record = makespan.findPath(matrix, planeCount=4)
+        assert len(balanced) == 4
+        assert sorted(sum((p[1:-1] for p in balanced), [])) == list(range(1, 40))
+        assert np.isclose(record, max(lengths(balanced)))
+        assert record < max(lengths(path))
+        assert min(lengths(balanced)) > 0.5 * record
+
+    # без раундов выравнивания остаётся только деление общего обхода
+    split, splitRecord = HeuristicSolver(objective="makespan", maxRounds=0).findPath(matrix, planeCount=4)
+    assert sorted(sum((p[1:-1] for p in split), [])) == list(range(1, 40))
+    assert np.isclose(splitRecord, max(lengths(split)))
+    assert splitRecord >= HeuristicSolver(objective="makespan").findPath(matrix, planeCount=4)[1] - 1e-9
+
+    with pytest.raises(ValueError):
+        HeuristicSolver(objective="fuel")
+
+
+def test_little_with_forbidden_corridors():
+    rng = np.random.default_rng(16)
+    for _ in range(100):
+        matrix = rng.uniform(1, 20, (6, 6))
+        matrix[rng.random((6, 6)) < 0.3] = INFINITY
+        np.fill_diagonal(matrix, np.inf)
+        optimum = min(sum(matrix[a, b] for a, b in zip((0,) + p, p + (0,)))
+                      for p in itertools.permutations(range(1, 6)))
+        L = LittleSolver()
+        path, record = L.findPath(matrix)
+        assert np.isclose(record, optimum)
+        # рабочая матрица откатилась: запретные клетки точно, остальные - с точностью округления
+        work, forbidden = L._LittleSolver__work, ~(matrix < INFINITY)
+        assert np.array_equal(work[forbidden], matrix[forbidden])
+        assert np.allclose(work[~forbidden], matrix[~forbidden], rtol=1e-12, atol=0)
+
+
+def test_no_tour_within_budget():
+    rng = np.random.default_rng(17)
+    matrix = rng.uniform(1, 20, (12, 12))
+    np.fill_diagonal(matrix, np.inf)
+    for strategy in ("depth", "best"):
+        L = LittleSolver(strategy=strategy, nodeLimit=1)
+        path, record = L.findPath(matrix)
+        assert path == [] and record == np.inf
+        assert L.gap == np.inf
+
+    forbidden = np.full((4, 4), np.inf)  # обхода нет вовсе
+    L = LittleSolver()
+    assert L.findPath(forbidden) == ([], np.inf)
+    assert L.gap == 0
@@ -1,22 +1,27 @@
 import logging
 
 from vizualization import draw_all
-from read_data import read_data
-from kommivoyager import LittleSolver
+from kommivoyager import LittleSolver, HeuristicSolver, HeldKarpSolver
 from matrix_handler import MatrixHandler
-from config import LOG_FILE, INPUT_FILE
+from scenario import Scenario
+from config import LOG_FILE, INPUT_FILE, EXACT_SOLVER_MAX_POINTS, HELD_KARP_MAX_POINTS, ROADS_CACHE_DIR, \
+    PLOT_FILE
 
 logging.basicConfig(filename=LOG_FILE, level=logging.INFO)
 
 if __name__ == '__main__':
-    solver = LittleSolver()
-    handler = MatrixHandler()
-
     filename = INPUT_FILE
-    matrix_of_roads = handler.get_roads_matrix(filename)
+    scenario = Scenario.from_file(filename)
 
-    matrix_of_distances = handler.get_distances_from_matrix_of_roads(matrix_of_roads)
+    handler = MatrixHandler(scenario, cache_dir=ROADS_CACHE_DIR)
+    roads, matrix_of_distances = handler.get_roads_and_distances()
+    if len(matrix_of_distances) <= HELD_KARP_MAX_POINTS:
+        solver = HeldKarpSolver()
+    elif len(matrix_of_distances) <= EXACT_SOLVER_MAX_POINTS:
+        solver = LittleSolver(warmStart=True)
+    else:
+        solver = HeuristicSolver()
     path, record = solver.findPath(matrix_of_distances)
 
-    data = read_data(filename)
-    draw_all(path, data)
+    # по умолчанию (PLOT_FILE = None) показывается окно; файл рисуется, только если он задан в config
+    draw_all(path, scenario.to_data(), roads, filename=PLOT_FILE)
@@ -1,89 +1,192 @@
 import numpy as np
-import json
 import logging
+import os
+
+from concurrent.futures import ProcessPoolExecutor
 
 from roadupdater import RoadUpdater
-from geometry import Point
-from config import INFINITY
+from road_store import RoadStore
+from geometry import blocked_segments
+from scenario import Scenario
+from config import INFINITY, GEOMETRIC_INACCURACY, ROAD_WORKERS, ROADS_IN_TASK, ROADS_CACHE_VERSION
+
+_worker_updater = None  # RoadUpdater процесса-исполнителя, создаётся один раз в _init_road_worker
+
+
+def _init_road_worker(scenario):
+    global _worker_updater
+    _worker_updater = RoadUpdater(scenario)
+
+
+def _build_roads(pairs):
+    """Строит дороги для пар индексов точек в процессе-исполнителе
+
+    Возвращает пары, общую таблицу частей дорог (см. Road.to_rows) и смещения дорог в ней,
+    чтобы между процессами передавались массивы, а не графы объектов Road/Segment/Arc.
+    """
+    scenario = _worker_updater.scenario
+    roads = _worker_updater.update_roads(scenario.points, pairs, scenario.waypoints)
+    tables = [road.to_rows(scenario.circles) for road in roads]
+    offsets = np.cumsum([0] + [len(table) for table in tables])
+    return pairs, np.concatenate(tables), offsets
 
 
 class MatrixHandler:
-    def __init__(self):
-        self.__data = {}
+    def __init__(self, scenario=None, workers=ROAD_WORKERS, cache_dir=None):
+        self.__scenario = scenario
+        self.__workers = workers
+        self.__cache_dir = cache_dir
         self.__simple_matrix = np.array([])
-        self.__marked_matrix = np.array([])
         self.__matrix_without_forbidden_lines = np.array([])
-        self.__matrix_of_roads = []
+        self.__roads = None
 
-    def get_distances_matrix(self, filename):
-        """Interface method for getting distance matrix from json file"""
-        self.__extract_data(filename)
-        self.__remove_forbidden_lines()
+    def get_distances_matrix(self, filename=None, dtype=np.float64):
+        """Interface method for getting distance matrix from json file (or from the preloaded scenario)
+
+        Строки и столбцы идут в порядке точек сценария, их id - в point_ids.
+        """
+        if filename is not None:
+            self.__extract_data(filename)
+        self.__remove_forbidden_lines(dtype)
         return self.__matrix_without_forbidden_lines
 
-    def get_roads_matrix(self, filename):
-        self.__extract_data(filename)
+    def get_roads_matrix(self, filename=None):
+        """Матрица дорог с заголовком; объекты Road создаются из хранилища дорог (см. get_road_store)"""
+        return self.get_road_store(filename).to_matrix()
+
+    def get_road_store(self, filename=None):
+        """Дороги между всеми парами точек (RoadStore)
+
+        Если задан cache_dir, дороги берутся из кэша по хэшу сценария или сохраняются в него.
+        """
+        if filename is not None:
+            self.__extract_data(filename)
+        self.__remove_forbidden_lines()
+        if not self.__load_cached_roads():
+            self.__radars_bypass()
+            self.__save_cached_roads()
+        return self.__roads
+
+    def get_roads_and_distances(self, filename=None):
+        """Хранилище дорог и матрица их длин"""
+        roads = self.get_road_store(filename)
+        return roads, roads.distances()
+
+    def update_roads_matrix(self, roads, scenario):
+        """Дороги для изменённого сценария scenario по дорогам roads прежнего сценария
+
+        roads - RoadStore или матрица дорог с заголовком; возвращается то же представление.
+        Изменение - добавленные, удалённые или изменённые зоны и точки (зоны и точки сопоставляются по id).
+        Дорога остаётся кратчайшей, если в неё не врезалась новая (или выросшая) зона и если убранная
+        (или уменьшенная) зона не открыла путь короче: любой такой путь проходит через место убранной зоны
+        и лежит в эллипсе с фокусами в концах дороги и суммой расстояний, равной её длине.
+        Заново строятся только дороги новых точек и дороги, для которых не выполнено одно из этих условий,
+        остальные дороги переносятся из roads без изменений.
+        """
+        previous = self.__scenario
+        as_matrix = not isinstance(roads, RoadStore)
+        if as_matrix:
+            roads = RoadStore.from_matrix(roads, previous.circles)
+        removed_zones, added_zones = self.__changed_zones(previous, scenario)
+        # номер каждой точки нового сценария в прежнем сценарии (по id точек) или -1
+        previous_of = np.array([previous.point_index.get(int(point_id), -1) for point_id in scenario.point_ids],
+                               dtype=np.int64)
+
+        self.__scenario = scenario
         self.__remove_forbidden_lines()
-        self.__radars_bypass()
-        return self.__matrix_of_roads
+        matrix = self.__matrix_without_forbidden_lines
+        points = scenario.points
+
+        pairs = np.argwhere(np.triu(matrix < INFINITY - 1, k=1))
+        a, b = previous_of[pairs[:, 0]], previous_of[pairs[:, 1]]
+        known = previous_of >= 0
+        moved = ~known
+        moved[known] = (previous.points[previous_of[known]] != points[known]).any(axis=1)
+        # дорогу можно взять, только если обе точки остались на месте и порядок точек пары не изменился
+        reusable = (a < b) & ~moved[pairs[:, 0]] & ~moved[pairs[:, 1]]
+        road_index = np.full(len(pairs), -1, dtype=np.int64)
+        road_index[reusable] = [roads.road_index(i, j) for i, j in zip(a[reusable], b[reusable])]
+        reusable &= road_index >= 0
+        kept, kept_roads, rebuild = pairs[reusable], road_index[reusable], pairs[~reusable]
+
+        changed = self.__may_shorten(points[kept[:, 0]], points[kept[:, 1]], roads.lengths[kept_roads],
+                                     removed_zones) | roads.touch_zones(kept_roads, added_zones)
+        rebuild = np.concatenate([rebuild, kept[changed]])
+        parts, offsets = roads.take(kept_roads[~changed])
+        # номера окружностей в дугах переносятся на порядок зон нового сценария (по id зон)
+        zone_index = {zone_id: k for k, zone_id in enumerate(scenario.zone_ids)}
+        renumber = np.array([zone_index.get(zone_id, -1) for zone_id in previous.zone_ids] + [-1], dtype=np.float64)
+        parts[:, 5] = renumber[parts[:, 5].astype(np.int64)]
+
+        self.__roads = RoadStore.concatenate(len(points), scenario.circles,
+                                             [(kept[~changed], parts, offsets), self.__build_roads(rebuild)])
+        logging.info(f"Обновили матрицу дорог: убрано зон {len(removed_zones)}, добавлено {len(added_zones)}, "
+                     f"перестроено дорог {len(rebuild)} из {len(pairs)}")
+        self.__save_cached_roads()
+        return self.__roads.to_matrix() if as_matrix else self.__roads
 
     ###########################################################
 
+    @staticmethod
+    def __changed_zones(previous, scenario):
+        """Зоны (x, y, r) прежнего сценария, которых нет в новом, и зоны нового, которых не было в прежнем
+
+        Изменённая зона попадает в оба массива: старая версия как убранная, новая - как добавленная.
+        """
+        before = {zone_id: tuple(zone) for zone_id, zone in zip(previous.zone_ids, previous.zones)}
+        after = {zone_id: tuple(zone) for zone_id, zone in zip(scenario.zone_ids, scenario.zones)}
+        removed = [zone for zone_id, zone in before.items() if after.get(zone_id) != zone]
+        added = [zone for zone_id, zone in after.items() if before.get(zone_id) != zone]
+        return np.array(removed, dtype=np.float64).reshape(-1, 3), np.array(added, dtype=np.float64).reshape(-1, 3)
+
+    @staticmethod
+    def __may_shorten(starts, finishes, lengths, zones):
+        """Для K дорог - может ли путь через место одной из зон оказаться короче дороги
+
+        Для точки x круга |x - A| + |x - B| >= |c - A| + |c - B| - 2r, так что зона, для которой это
+        больше длины дороги, не пересекает её эллипс. Дорога с неконечной длиной (неудавшийся облёт)
+        перестраивается при удалении любой зоны: сравнение с NaN всегда ложно.
+        """
+        to_start = np.linalg.norm(zones[np.newaxis, :, :2] - starts[:, np.newaxis, :], axis=-1)
+        to_finish = np.linalg.norm(zones[np.newaxis, :, :2] - finishes[:, np.newaxis, :], axis=-1)
+        bound = to_start + to_finish - 2 * zones[np.newaxis, :, 2]
+        changed = (bound < lengths[:, np.newaxis] + GEOMETRIC_INACCURACY).any(axis=1)
+        if len(zones):
+            changed |= ~np.isfinite(lengths)
+        return changed
+
     def __extract_data(self, filename):
         """ Extracting data from json file """
 
-        with open(filename) as f:
-            data = json.load(f)
-        self.__data = data
+        self.__scenario = Scenario.from_file(filename)
         logging.info("Прочитали данные")
 
-    @staticmethod
-    def __distance(point1, point2):
-        """Calculates distance between point1 and point2"""
+    @property
+    def scenario(self):
+        return self.__scenario
 
-        return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
+    @property
+    def point_ids(self):
+        """id точек - строк и столбцов матрицы расстояний"""
+        return self.__scenario.point_ids
 
-    def __simple_distance_matrix(self):
+    def __simple_distance_matrix(self, dtype=np.float64):
         """Creates matrix of distances between points without regard to forbidden zones, lines and relief"""
 
-        points = self.__data["data_points"]
-        p_quantity = len(points)
-        matrix = np.full((p_quantity, p_quantity), np.Inf)
-        for i in range(p_quantity):
-            for j in range(p_quantity):
-                if i > j:
-                    continue
-                d = self.__distance((points[i]["x"], points[i]["y"]),
-                                    (points[j]["x"], points[j]["y"]))
-                if i != j:
-                    matrix[i, j] = d
-                    matrix[j, i] = d
+        points = np.asarray(self.__scenario.points, dtype=dtype)
+        matrix = np.hypot(points[:, np.newaxis, 0] - points[np.newaxis, :, 0],
+                          points[:, np.newaxis, 1] - points[np.newaxis, :, 1])
+        np.fill_diagonal(matrix, np.inf)
         self.__simple_matrix = matrix
         logging.info("Создали матрицу расстояний")
 
-    def __mark_matrix_by_point_ids(self):
-        """Inserts point ids as first raw and column of the matrix"""
-        self.__simple_distance_matrix()
-        id_row = [x["id"] for x in self.__data["data_points"]]
-        id_column = np.array([0] +
-                             [x["id"] for x in self.__data["data_points"]])[:, np.newaxis]
-        matrix = np.vstack([id_row, self.__simple_matrix])
-        matrix = np.hstack([id_column, matrix])
-        self.__marked_matrix = matrix
-        logging.info("Помечаем каждый столбец и строчку id соответствующей точки")
-
-    def __remove_forbidden_lines(self):
-        """Sets distance of forbidden lines as np.inf"""
-        self.__mark_matrix_by_point_ids()
-        forbidden_lines = [(x["id1"], x["id2"]) for x in self.__data["forbidden_lines"]]
-        forbidden_lines_x = [x[0] for x in forbidden_lines]
-        forbidden_lines_y = [x[1] for x in forbidden_lines]
-        matrix = self.__marked_matrix
-        for (x, y), value in np.ndenumerate(matrix):
-            if int(matrix[x, 0]) in forbidden_lines_x \
-                    and int(matrix[0, y]) in forbidden_lines_y:
-                matrix[x, y] = INFINITY
-                matrix[y, x] = INFINITY
+    def __remove_forbidden_lines(self, dtype=np.float64):
+        """Sets distance of forbidden lines as INFINITY"""
+        self.__simple_distance_matrix(dtype)
+        matrix = self.__simple_matrix
+        rows, columns = self.__scenario.forbidden_pairs.T
+        matrix[rows, columns] = INFINITY
+        matrix[columns, rows] = INFINITY
         self.__matrix_without_forbidden_lines = matrix
         logging.info("Удалили запрещенные воздушные коридоры")
 
@@ -91,45 +194,81 @@ class MatrixHandler:
     def __radars_bypass(self):
         """Эта функция будет обновлять матрицу расстояний"""
         matrix = self.__matrix_without_forbidden_lines
-        self.__matrix_of_roads = np.empty(matrix.shape, dtype=object)
-
-        for i in range(1, matrix.shape[0]):
-            for j in range(1, matrix.shape[1]):
-                if i > j or matrix[i, j] > (INFINITY - 1):
-                    continue
-
-                point1_x = [p["x"] for p in self.__data["data_points"]
-                            if p["id"] == matrix[i, 0]][0]
-                point1_y = [p["y"] for p in self.__data["data_points"]
-                            if p["id"] == matrix[i, 0]][0]
-                point2_x = [p["x"] for p in self.__data["data_points"]
-                            if p["id"] == matrix[0, j]][0]
-                point2_y = [p["y"] for p in self.__data["data_points"]
-                            if p["id"] == matrix[0, j]][0]
-
-                road = self.__update_road(Point(point1_x, point1_y), Point(point2_x, point2_y))
-                self.__matrix_of_roads[i, j] = road
-                self.__matrix_of_roads[j, i] = road
+        allowed = np.triu(matrix < INFINITY - 1, k=1)
+        self.__roads = RoadStore.concatenate(len(allowed), self.__scenario.circles,
+                                             [self.__build_roads(np.argwhere(allowed))])
 
-    @staticmethod
-    def __update_road(point1, point2):
-        """Эта функция будет возвращать объект Road - путь между двумя точками, учитывая облёт препятствий"""
-        updater = RoadUpdater()
-        updated_road = updater.update_road(point1, point2)
-        return updated_road
+    def __build_roads(self, pairs):
+        """Строит дороги для пар индексов точек pairs (i < j): пары, таблица частей и смещения дорог в ней"""
+        points = self.__scenario.points
+        # сразу для всех пар определяем, какие отрезки задевают зоны; облёт строим только для них
+        blocked = blocked_segments(points[pairs[:, 0]], points[pairs[:, 1]], self.__scenario.zones)
+        straight = pairs[~blocked]
+        tables = [(straight, *RoadStore.straight_rows(points[straight[:, 0]], points[straight[:, 1]]))]
+
+        blocked_pairs_list = pairs[blocked]
+        if self.__workers and self.__workers > 1 and len(blocked_pairs_list) > ROADS_IN_TASK:
+            tables += self.__parallel_bypass(blocked_pairs_list)
+        elif len(blocked_pairs_list):
+            updater = RoadUpdater(self.__scenario)  # один updater на все пары: сценарий уже в памяти
+            circles = self.__scenario.circles
+            detours = [road.to_rows(circles) for road in updater.update_roads(points, blocked_pairs_list)]
+            tables.append((blocked_pairs_list, *RoadStore.join_tables(detours)))
+        logging.info(f"Построили дороги: {len(pairs)} пар, из них с облётом {len(blocked_pairs_list)}")
+        return RoadStore.concatenate_tables(tables)
+
+    def __parallel_bypass(self, pairs):
+        """Строит облёты для пар pairs в пуле из self.__workers процессов, возвращает таблицы дорог блоков
+
+        Пары раздаются блоками не меньше ROADS_IN_TASK, и все пары одной точки-начала попадают в один блок,
+        чтобы для неё в процессе был один поиск по графу касательных.
+        """
+        pairs = pairs[np.argsort(pairs[:, 0], kind="stable")]
+        _, starts = np.unique(pairs[:, 0], return_index=True)
+        chunks, first = [], 0
+        for start in starts[1:].tolist() + [len(pairs)]:
+            if start - first >= ROADS_IN_TASK or start == len(pairs):
+                chunks.append(pairs[first:start])
+                first = start
+        graph = self.__scenario.visibility_graph  # граф строим до запуска процессов, они получат его готовым
+        self.__scenario.waypoints  # и касательные из точек тоже, иначе каждый блок пересчитывает их для всех точек
+        logging.info(f"Построили {graph}")
+        with ProcessPoolExecutor(max_workers=self.__workers, initializer=_init_road_worker,
+                                 initargs=(self.__scenario,)) as executor:
+            tables = list(executor.map(_build_roads, chunks))
+        logging.info(f"Построили облёты в {self.__workers} процессах")
+        return tables
+
+    def __cache_file(self):
+        return os.path.join(self.__cache_dir, f"roads_v{ROADS_CACHE_VERSION}_{self.__scenario.digest()}.npz")
+
+    def __load_cached_roads(self):
+        """Читает дороги из кэша. False, если кэш не задан или для сценария ещё нет файла"""
+        if self.__cache_dir is None or not os.path.exists(self.__cache_file()):
+            return False
+        with np.load(self.__cache_file(), allow_pickle=False) as cache:
+            self.__roads = RoadStore(len(self.__scenario.points), self.__scenario.circles,
+                                     cache["pairs"], cache["parts"], cache["offsets"])
+        logging.info(f"Взяли дороги из кэша {self.__cache_file()}")
+        return True
+
+    def __save_cached_roads(self):
+        """Сохраняет таблицы хранилища дорог (пары, части, смещения) в .npz"""
+        if self.__cache_dir is None:
+            return
+        os.makedirs(self.__cache_dir, exist_ok=True)
+        temporary = self.__cache_file() + ".tmp.npz"
+        np.savez(temporary, pairs=self.__roads.pairs, offsets=self.__roads.offsets, parts=self.__roads.parts)
+        os.replace(temporary, self.__cache_file())
+        logging.info(f"Сохранили дороги в кэш {self.__cache_file()}")
 
     @staticmethod
     def get_distances_from_matrix_of_roads(matrix_of_roads):
-        """Делаем из матрицы дорог матрицу расстояний"""
-        dist_matrix = np.full((matrix_of_roads.shape[0] - 1,
-                               matrix_of_roads.shape[1] - 1),
-                              fill_value=INFINITY, dtype=np.float64)
-        for i in range(1, matrix_of_roads.shape[0]):
-            for j in range(1, matrix_of_roads.shape[1]):
-                if i == j:  # если диагональный элемент
-                    dist_matrix[i - 1, j - 1] = np.inf
-                    continue
-                if not matrix_of_roads[i, j]:  # запретный коридор
-                    continue
-                dist_matrix[i - 1, j - 1] = matrix_of_roads[i, j].length
+        """Делаем из матрицы дорог (или RoadStore) матрицу расстояний"""
+        if isinstance(matrix_of_roads, RoadStore):
+            return matrix_of_roads.distances()
+        roads = matrix_of_roads[1:, 1:]
+        dist_matrix = np.array([INFINITY if road is None else road.length for road in roads.ravel()],
+                               dtype=np.float64).reshape(roads.shape)  # None - запретный коридор
+        np.fill_diagonal(dist_matrix, np.inf)
         return dist_matrix
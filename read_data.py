@@ -1,4 +1,27 @@
 import json
+import numpy as np
+
+from config import SCENARIO_READ_CHUNK
+
+
+# разделы сценария и обязательные поля их записей
+SCENARIO_SECTIONS = {
+    "data_points": ("id", "x", "y"),
+    "data_forbidden_zone": ("id", "x", "y", "r"),
+    "forbidden_lines": ("id1", "id2"),
+    "relief": ("id", "x", "y"),
+}
+# значения поля "type" записей в формате JSON Lines
+JSONL_TYPES = {
+    "point": "data_points",
+    "zone": "data_forbidden_zone",
+    "line": "forbidden_lines",
+    "relief": "relief",
+}
+
+
+class ScenarioFormatError(ValueError):
+    """Файл сценария не соответствует ожидаемой схеме"""
 
 
 def read_data(filename):
@@ -6,3 +29,136 @@ def read_data(filename):
     with open(filename) as f:
         data = json.load(f)
     return data
+
+
+def read_scenario(filename):
+    """Читает сценарий из json или jsonl файла за один проход сразу в массивы NumPy
+
+    Возвращает словарь: points (N, 3) - id, x, y; zones (M, 4) - id, x, y, r; lines (F, 2) - id1, id2;
+    relief (R, 3) - id, x, y. Файл читается блоками, записи проверяются по мере чтения, поэтому
+    ошибка схемы (ScenarioFormatError) сообщается сразу, без разбора остатка файла.
+    """
+    rows = {section: [] for section in SCENARIO_SECTIONS}
+    with open(filename) as f:
+        if str(filename).endswith(".jsonl"):
+            records = _jsonl_records(f)
+        else:
+            records = _JsonStream(f).records()
+        for section, index, record in records:
+            rows[section].append(_record_row(section, index, record))
+    return {
+        "points": np.array(rows["data_points"], dtype=np.float64).reshape(-1, 3),
+        "zones": np.array(rows["data_forbidden_zone"], dtype=np.float64).reshape(-1, 4),
+        "lines": np.array(rows["forbidden_lines"], dtype=np.int64).reshape(-1, 2),
+        "relief": np.array(rows["relief"], dtype=np.float64).reshape(-1, 3),
+    }
+
+
+def _record_row(section, index, record):
+    """Значения обязательных полей записи в порядке SCENARIO_SECTIONS"""
+    if not isinstance(record, dict):
+        raise ScenarioFormatError(f"{section}[{index}]: ожидался объект, получено {record!r}")
+    row = []
+    for field in SCENARIO_SECTIONS[section]:
+        value = record.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ScenarioFormatError(f"{section}[{index}]: поле {field} должно быть числом, получено {value!r}")
+        if field.startswith("id") and not isinstance(value, int):
+            raise ScenarioFormatError(f"{section}[{index}]: поле {field} должно быть целым, получено {value!r}")
+        row.append(value)
+    return row
+
+
+def _jsonl_records(f):
+    """Записи файла JSON Lines: на каждой строке объект с полем type (point, zone, line или relief)"""
+    for number, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ScenarioFormatError(f"строка {number}: {error}") from None
+        section = JSONL_TYPES.get(record.get("type")) if isinstance(record, dict) else None
+        if section is None:
+            raise ScenarioFormatError(f"строка {number}: неизвестный тип записи {record!r}")
+        yield section, number, record
+
+
+class _JsonStream:
+    """Потоковый разбор json объекта сценария: элементы разделов-массивов выдаются по одному
+
+    В памяти держится только текущий блок файла, а не весь документ или всё его дерево.
+    """
+
+    def __init__(self, f):
+        self.__file = f
+        self.__buffer = ""
+        self.__position = 0
+        self.__eof = False
+        self.__decoder = json.JSONDecoder()
+
+    def records(self):
+        """Пары (раздел, номер, запись) для всех элементов разделов SCENARIO_SECTIONS"""
+        self.__expect("{")
+        if self.__peek() == "}":
+            return
+        while True:
+            key = self.__value()
+            if not isinstance(key, str):
+                raise ScenarioFormatError(f"ожидалось имя поля, получено {key!r}")
+            self.__expect(":")
+            if key in SCENARIO_SECTIONS:
+                if self.__peek() != "[":
+                    raise ScenarioFormatError(f"{key}: ожидался массив")
+                yield from ((key, index, record) for index, record in enumerate(self.__array()))
+            else:
+                self.__value()
+            if self.__expect(",}") == "}":
+                return
+
+    def __array(self):
+        self.__expect("[")
+        if self.__peek() == "]":
+            self.__position += 1
+            return
+        while True:
+            yield self.__value()
+            if self.__expect(",]") == "]":
+                return
+
+    def __fill(self):
+        chunk = self.__file.read(SCENARIO_READ_CHUNK)
+        self.__buffer = self.__buffer[self.__position:] + chunk
+        self.__position = 0
+        self.__eof = not chunk
+
+    def __peek(self):
+        """Следующий значащий символ (без его поглощения) или пустая строка в конце файла"""
+        while True:
+            while self.__position < len(self.__buffer) and self.__buffer[self.__position].isspace():
+                self.__position += 1
+            if self.__position < len(self.__buffer) or self.__eof:
+                return self.__buffer[self.__position:self.__position + 1]
+            self.__fill()
+
+    def __expect(self, characters):
+        character = self.__peek()
+        if not character or character not in characters:
+            raise ScenarioFormatError(f"ожидался один из символов {characters!r}, получено {character!r}")
+        self.__position += 1
+        return character
+
+    def __value(self):
+        """Очередное значение json; блоки дочитываются, пока значение не окажется целиком в буфере"""
+        self.__peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__position)
+                # число в конце буфера могло оборваться на границе блока
+                if end < len(self.__buffer) or self.__eof:
+                    self.__position = end
+                    return value
+            except json.JSONDecodeError as error:
+                if self.__eof:
+                    raise ScenarioFormatError(str(error)) from None
+            self.__fill()
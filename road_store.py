@@ -0,0 +1,197 @@
+import numpy as np
+
+from roadupdater import Road, SEGMENT_PART, ARC_PART
+from geometry import blocked_segments, arc_point_counts
+from config import INFINITY, GEOMETRIC_INACCURACY, ARC_DISCRETISATION, ARC_DRAW_TOLERANCE
+
+
+class RoadStore:
+    """Дороги между всеми парами точек в виде набора массивов (struct-of-arrays)
+
+    Части всех дорог лежат в одной таблице (K, 6) - тип части, x1, y1, x2, y2, индекс окружности
+    (как в Road.to_rows), дорога k занимает строки offsets[k]:offsets[k + 1], а матрица index (N, N)
+    хранит номер дороги для пары точек (или -1). Дорога хранится один раз для пары (i, j), i < j,
+    и направлена от i к j. Объекты Road создаются только по запросу store[i, j].
+    """
+
+    def __init__(self, size, circles, pairs=None, parts=None, offsets=None):
+        self.__circles = tuple(circles)
+        self.__zones = np.array([(c.x, c.y, c.r) for c in self.__circles], dtype=np.float64).reshape(-1, 3)
+        self.__pairs = np.empty((0, 2), dtype=np.int64) if pairs is None else np.asarray(pairs, dtype=np.int64)
+        self.__parts = np.empty((0, 6)) if parts is None else np.asarray(parts, dtype=np.float64).reshape(-1, 6)
+        self.__offsets = np.zeros(1, dtype=np.int64) if offsets is None else np.asarray(offsets, dtype=np.int64)
+        self.__pairs = self.__pairs.reshape(-1, 2)
+
+        self.__index = np.full((size, size), -1, dtype=np.int64)
+        roads = np.arange(len(self.__pairs))
+        self.__index[self.__pairs[:, 0], self.__pairs[:, 1]] = roads
+        self.__index[self.__pairs[:, 1], self.__pairs[:, 0]] = roads
+        self.__lengths = self.__road_lengths()
+
+    def __repr__(self):
+        return f"RoadStore: points={len(self.__index)}, roads={len(self.__pairs)}, parts={len(self.__parts)}"
+
+    @classmethod
+    def from_roads(cls, size, circles, pairs, roads):
+        """Хранилище из объектов Road для пар pairs"""
+        tables = [road.to_rows(circles) for road in roads]
+        return cls(size, circles, pairs, *cls.join_tables(tables))
+
+    @classmethod
+    def from_matrix(cls, matrix_of_roads, circles):
+        """Хранилище из матрицы дорог с заголовком (как у MatrixHandler.get_roads_matrix)"""
+        roads = matrix_of_roads[1:, 1:]
+        pairs = np.argwhere(np.triu(roads != None, k=1))  # noqa: E711 - поэлементно
+        return cls.from_roads(len(roads), circles, pairs, [roads[i, j] for i, j in pairs])
+
+    @classmethod
+    def concatenate(cls, size, circles, tables):
+        """Хранилище из нескольких таблиц дорог (пары, таблица частей, смещения); дороги упорядочиваются по парам"""
+        store = cls(size, circles, *cls.concatenate_tables(tables))
+        order = np.lexsort((store.pairs[:, 1], store.pairs[:, 0]))
+        return cls(size, circles, store.pairs[order], *store.take(order))
+
+    @staticmethod
+    def concatenate_tables(tables):
+        """Склеивает несколько таблиц дорог (пары, таблица частей, смещения) в одну"""
+        pairs = [np.asarray(table[0], dtype=np.int64).reshape(-1, 2) for table in tables]
+        parts = [np.asarray(table[1], dtype=np.float64).reshape(-1, 6) for table in tables]
+        shifts = np.cumsum([0] + [len(part) for part in parts])
+        offsets = [np.asarray(table[2][1:], dtype=np.int64) + shift for table, shift in zip(tables, shifts)]
+        return (np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64),
+                np.concatenate(parts) if parts else np.empty((0, 6)),
+                np.concatenate([[0]] + offsets).astype(np.int64))
+
+    @staticmethod
+    def join_tables(tables):
+        """Склеивает таблицы частей отдельных дорог в одну таблицу и смещения дорог в ней"""
+        offsets = np.cumsum([0] + [len(table) for table in tables])
+        return (np.concatenate(tables) if tables else np.empty((0, 6))), offsets
+
+    @staticmethod
+    def straight_rows(starts, finishes):
+        """Таблица дорог из одного отрезка starts[k] - finishes[k] и их смещения"""
+        count = len(starts)
+        parts = np.column_stack([np.full(count, SEGMENT_PART), starts, finishes, np.full(count, -1)])
+        return parts.astype(np.float64).reshape(-1, 6), np.arange(count + 1)
+
+    @property
+    def size(self):
+        return len(self.__index)
+
+    @property
+    def circles(self):
+        return self.__circles
+
+    @property
+    def pairs(self):
+        """Пары (i, j), i < j, для которых есть дорога, shape (R, 2)"""
+        return self.__pairs
+
+    @property
+    def parts(self):
+        """Общая таблица частей дорог, shape (K, 6)"""
+        return self.__parts
+
+    @property
+    def offsets(self):
+        """Смещения дорог в таблице частей, shape (R + 1,)"""
+        return self.__offsets
+
+    @property
+    def lengths(self):
+        """Длины дорог, shape (R,)"""
+        return self.__lengths
+
+    def __len__(self):
+        return len(self.__pairs)
+
+    def __getitem__(self, pair):
+        """Дорога между точками i и j (объект Road) или None, если дороги нет"""
+        road = self.__index[pair]
+        if road < 0:
+            return None
+        return Road.from_rows(self.__parts[self.__offsets[road]:self.__offsets[road + 1]], self.__circles)
+
+    def road_index(self, i, j):
+        """Номер дороги между точками i и j в pairs/lengths или -1"""
+        return int(self.__index[i, j])
+
+    def rows(self, road):
+        """Строки таблицы частей дороги с номером road"""
+        return self.__parts[self.__offsets[road]:self.__offsets[road + 1]]
+
+    def take(self, roads):
+        """Таблица частей и смещения для дорог с номерами roads (в этом порядке)"""
+        roads = np.asarray(roads, dtype=np.int64)
+        starts, finishes = self.__offsets[roads], self.__offsets[roads + 1]
+        sizes = finishes - starts
+        rows = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        return self.__parts[rows], np.concatenate([[0], np.cumsum(sizes)])
+
+    def touch_zones(self, roads, zones):
+        """Для дорог с номерами roads - задевает ли какая-нибудь их часть одну из зон (M, 3)
+
+        Отрезок задевает зону, если пересекает или касается её; дуга - если её окружность пересекается с зоной.
+        """
+        roads = np.asarray(roads, dtype=np.int64)
+        if len(zones) == 0 or len(roads) == 0:
+            return np.zeros(len(roads), dtype=bool)
+        parts, offsets = self.take(roads)
+        road_of_part = np.repeat(np.arange(len(roads)), np.diff(offsets))
+        touched = np.zeros(len(parts), dtype=bool)
+        segments = parts[:, 0] == SEGMENT_PART
+        touched[segments] = blocked_segments(parts[segments, 1:3], parts[segments, 3:5], zones)
+        circles = self.__zones[parts[~segments, 5].astype(np.int64)]
+        gaps = np.hypot(circles[:, np.newaxis, 0] - zones[np.newaxis, :, 0],
+                        circles[:, np.newaxis, 1] - zones[np.newaxis, :, 1]) - circles[:, np.newaxis, 2] - zones[:, 2]
+        touched[~segments] = (gaps <= GEOMETRIC_INACCURACY).any(axis=1)
+        return np.bincount(road_of_part, weights=touched, minlength=len(roads)) > 0
+
+    def polylines(self, roads, tolerance=ARC_DRAW_TOLERANCE):
+        """Ломаные для рисования дорог с номерами roads одним LineCollection на слой
+
+        Возвращает отрезки shape (S, 2, 2) и список дуг - ломаных (n_k, 2), отходящих от дуги не больше чем
+        на tolerance (не больше ARC_DISCRETISATION точек); дуга идёт по короткой стороне окружности, как в Arc.draw.
+        """
+        parts, _ = self.take(roads)
+        arcs = parts[:, 0] == ARC_PART
+        segments = parts[~arcs, 1:5].reshape(-1, 2, 2)
+        circles = self.__zones[parts[arcs, 5].astype(np.int64)]
+        alpha = np.arctan2(parts[arcs, 2] - circles[:, 1], parts[arcs, 1] - circles[:, 0])
+        beta = np.arctan2(parts[arcs, 4] - circles[:, 1], parts[arcs, 3] - circles[:, 0])
+        sweeps = (beta - alpha + np.pi) % (2 * np.pi) - np.pi
+        counts = arc_point_counts(sweeps, circles[:, 2], tolerance, ARC_DISCRETISATION)
+        # все точки всех дуг одним массивом: номер дуги и доля угла для каждой точки
+        arc_of_point = np.repeat(np.arange(len(counts)), counts)
+        first = np.cumsum(counts) - counts
+        fraction = (np.arange(counts.sum()) - first[arc_of_point]) / (counts[arc_of_point] - 1)
+        angles = alpha[arc_of_point] + fraction * sweeps[arc_of_point]
+        centers, r = circles[arc_of_point, :2], circles[arc_of_point, 2]
+        points = np.column_stack([centers[:, 0] + r * np.cos(angles), centers[:, 1] + r * np.sin(angles)])
+        return segments, (np.split(points, first[1:]) if len(counts) else [])
+
+    def distances(self):
+        """Матрица длин дорог: np.inf на диагонали, INFINITY для пар без дороги"""
+        lengths = np.append(self.__lengths, np.float64(INFINITY))
+        matrix = lengths[self.__index]  # индекс -1 указывает на INFINITY
+        np.fill_diagonal(matrix, np.inf)
+        return matrix
+
+    def to_matrix(self):
+        """Матрица объектов Road с пустыми нулевыми строкой и столбцом (формат MatrixHandler.get_roads_matrix)"""
+        matrix = np.empty((self.size + 1, self.size + 1), dtype=object)
+        for i, j in self.__pairs.tolist():
+            matrix[i + 1, j + 1] = matrix[j + 1, i + 1] = self[i, j]
+        return matrix
+
+    def __road_lengths(self):
+        """Длины всех дорог одним проходом: отрезки - по расстоянию, дуги - как в Arc (по хорде)"""
+        kinds, circles = self.__parts[:, 0], self.__parts[:, 5].astype(np.int64)
+        chord = np.hypot(self.__parts[:, 3] - self.__parts[:, 1], self.__parts[:, 4] - self.__parts[:, 2])
+        arcs = kinds == ARC_PART
+        lengths = chord.copy()
+        r = self.__zones[circles[arcs], 2]
+        lengths[arcs] = 2 * r * np.arcsin(np.minimum(0.5 * chord[arcs] / r, 1))
+        road_of_part = np.repeat(np.arange(len(self.__pairs)), np.diff(self.__offsets))
+        return np.bincount(road_of_part, weights=lengths, minlength=len(self.__pairs))
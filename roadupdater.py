@@ -3,14 +3,22 @@ import numpy as np
 from abc import ABC, abstractmethod
 
 from geometry import *
-from read_data import read_data
-from itertools import chain
-from config import GEOMETRIC_INACCURACY, ARC_DISCRETISATION, ARC_WIDTH, LINE_WIDTH, LINE_COLOR
+from scenario import Scenario
+from config import GEOMETRIC_INACCURACY, ARC_DISCRETISATION, ARC_DRAW_TOLERANCE, ARC_WIDTH, LINE_WIDTH, LINE_COLOR, INPUT_FILE
+
+SEGMENT_PART = 0  # коды частей дороги в компактном табличном описании (см. Road.to_rows)
+ARC_PART = 1
 
 
 class RoadUpdater:
-    def __init__(self):
-        self.__circles = []
+    def __init__(self, scenario=None):
+        if scenario is None:
+            scenario = Scenario.from_file(INPUT_FILE)
+        self.__scenario = scenario
+        self.__circles = scenario.circles
+        self.__zones = scenario.zones
+        self.__grid = scenario.zone_grid
+        self.__graph = scenario.visibility_graph
         self.__road = Road()
         self.__A = Point(0, 0)
         self.__B = Point(0, 0)
@@ -21,39 +29,47 @@ class RoadUpdater:
         self.__make_road()
         return self.road
 
+    def update_roads(self, points, pairs, waypoints=None):
+        """Дороги для пар индексов pairs (K, 2) точек points (N, 2)
+
+        Вместо отдельного поиска на каждую пару граф касательных ищет из каждой точки-начала пути сразу
+        до всех её пар. waypoints - готовые касательные точек points (см. VisibilityGraph.waypoints),
+        без них касательные считаются только для точек из pairs.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        roads = []
+        for (i, j), path in zip(pairs, self.__graph.paths_between(points, pairs, waypoints)):
+            if path is None:  # по графу не пройти - облёт как для отдельной пары
+                roads.append(self.update_road(Point(*points[i]), Point(*points[j])))
+            else:
+                roads.append(self.__road_from_path(path))
+        return roads
+
     @property
     def circles(self):
         return self.__circles
 
-    def __get_circles_from_data(self, data):
-        for zone in data["data_forbidden_zone"]:
-            self.circles.append(Circle(zone["x"], zone["y"], zone["r"]))
-
-    def __distances_to_circles(self, point):
-        """Расстояния от точки до всех окружностей (не их центров)"""
-        return [(distance_between_points(x.center(), point) - x.r) for x in self.circles]
+    @property
+    def scenario(self):
+        return self.__scenario
 
     def __point_of_circle(self, point):
-        """Возвращает список окружностей, которым принадлежит точка"""
-        return [c for c in self.circles if distance_between_points(c.center(), point) < c.r + GEOMETRIC_INACCURACY]
+        """Возвращает список окружностей, которым принадлежит точка (проверяются только зоны из клетки точки)"""
+        candidates = self.__grid.point_candidates(point)
+        zones = self.__zones[candidates]
+        inside = distance_between_points_batch(zones[:, :2], np.broadcast_to([point.x, point.y], zones[:, :2].shape)) \
+            < zones[:, 2] + GEOMETRIC_INACCURACY
+        return [self.circles[k] for k in candidates[inside]]
 
     def __nearest_crossed_circle(self, point):
-        """Находит ближайший пересеченный круг прямой через данную точку и конечную точку (self.B)"""
-
-        lineAB = line_by_two_points(point, self.__B)  # Прямая АБ через начальную и конечную точку
-        self.__get_circles_from_data(read_data("input.json"))
+        """Находит ближайший пересеченный круг отрезком через данную точку и конечную точку (self.B)"""
 
-        # Список точек пересечения или касания прямой АБ co всеми окружностями которые она пересекает или касается
-        crossing_points_with_circles = list(chain(*[crossings(lineAB, c) for c in self.circles]))
-        crossing_points_with_circles = [p for p in crossing_points_with_circles
-                                        if (min(point.x, self.__B.x) <= p.x <= max(point.x, self.__B.x)
-                                            and min(point.y, self.__B.y) <= p.y <= max(point.y, self.__B.y))]
-
-        # Ближайший пересеченный круг
-        if crossing_points_with_circles:
-            nearest_crossed_circle = self.__point_of_circle(min(crossing_points_with_circles,
-                                                                key=lambda x: distance_between_points(x, point)))[0]
-            return nearest_crossed_circle
+        # Сетка отбирает зоны рядом с отрезком, они проверяются одним векторным проходом,
+        # t - параметр ближайшего пересечения вдоль отрезка
+        candidates = self.__grid.segment_candidates(point, self.__B)
+        crossed, t = segment_circle_crossings(point, self.__B, self.__zones[candidates])
+        if crossed.any():
+            return self.circles[int(candidates[np.argmin(t)])]
 
     def __make_road(self):
         nc_circle = self.__nearest_crossed_circle(self.__A)
@@ -62,6 +78,22 @@ class RoadUpdater:
             road.add(Segment(self.__A, self.__B))
             self.road = road
             return
+        # кратчайший облёт всех зон по графу касательных сценария
+        path = self.__graph.shortest_path(self.__A, self.__B)
+        if path is None:  # по графу не пройти (например, точка внутри зоны) - облетаем только ближайшую зону
+            self.__bypass_circle(nc_circle)
+            return
+        self.road = self.__road_from_path(path)
+
+    def __road_from_path(self, path):
+        """Дорога из частей пути VisibilityGraph"""
+        road = Road()
+        for circle_index, start, finish in path:
+            road.add(Segment(start, finish) if circle_index < 0 else Arc(self.circles[circle_index], start, finish))
+        return road
+
+    def __bypass_circle(self, nc_circle):
+        """Облёт одной окружности nc_circle по касательным из A и B"""
         tangentials_to_nc_circle_from_A = tangent_from_point_to_circle(self.__A, nc_circle)
         tangentials_to_nc_circle_from_B = tangent_from_point_to_circle(self.__B, nc_circle)
         possible_roads = []
@@ -127,6 +159,30 @@ class Road:
     def length(self):
         return self.__length
 
+    def to_rows(self, circles):
+        """Компактное описание дороги: массив (K, 6) строк (тип части, x1, y1, x2, y2, индекс окружности)
+
+        Для отрезков индекс окружности равен -1, для дуг - номер окружности в circles.
+        """
+        rows = np.empty((len(self.parts), 6), dtype=np.float64)
+        for k, part in enumerate(self.parts):
+            is_arc = isinstance(part, Arc)
+            rows[k] = (ARC_PART if is_arc else SEGMENT_PART,
+                       part.pointStart.x, part.pointStart.y, part.pointFinish.x, part.pointFinish.y,
+                       circles.index(part.circle) if is_arc else -1)
+        return rows
+
+    @classmethod
+    def from_rows(cls, rows, circles):
+        """Восстанавливает дорогу из описания Road.to_rows"""
+        road = cls()
+        for kind, x1, y1, x2, y2, circle_index in rows:
+            if int(kind) == ARC_PART:
+                road.add(Arc(circles[int(circle_index)], Point(x1, y1), Point(x2, y2)))
+            else:
+                road.add(Segment(Point(x1, y1), Point(x2, y2)))
+        return road
+
     def draw(self, ax):
         for part in self.parts:
             part.draw(ax)
@@ -201,7 +257,9 @@ class Arc(RoadPart):
     def draw(self, ax):
         alpha = np.arctan2((self.pointStart.y - self.circle.y), (self.pointStart.x - self.circle.x))
         beta = np.arctan2((self.pointFinish.y - self.circle.y), (self.pointFinish.x - self.circle.x))
-        arc_angles = np.linspace(alpha, beta, ARC_DISCRETISATION)
+        beta = alpha + (beta - alpha + np.pi) % (2 * np.pi) - np.pi  # по короткой дуге, в том числе через угол pi
+        points = arc_point_counts(beta - alpha, self.circle.r, ARC_DRAW_TOLERANCE, ARC_DISCRETISATION)
+        arc_angles = np.linspace(alpha, beta, int(points))
         arc_xs = self.circle.x + self.circle.r * np.cos(arc_angles)
         arc_ys = self.circle.y + self.circle.r * np.sin(arc_angles)
         ax.plot(arc_xs, arc_ys, color=LINE_COLOR, lw=ARC_WIDTH)
@@ -0,0 +1,177 @@
+import hashlib
+import numpy as np
+
+from geometry import Circle
+from spatial_index import ZoneGrid
+from visibility_graph import VisibilityGraph
+from read_data import read_scenario
+
+
+class Scenario:
+    """Неизменяемая модель сценария: точки, запретные зоны, запретные коридоры и рельеф.
+
+    Строится один раз (из словаря read_data, из массивов read_scenario или из файла) и передаётся в MatrixHandler и RoadUpdater,
+    поэтому при расчёте дорог для каждой пары точек файл не читается, а список зон не растёт.
+    """
+
+    def __init__(self, data):
+        points = data.get("data_points", [])
+        zones = data.get("data_forbidden_zone", [])
+        relief = data.get("relief", [])
+        self.__set_arrays([p["id"] for p in points], [(p["x"], p["y"]) for p in points],
+                          [z["id"] for z in zones], [(z["x"], z["y"], z["r"]) for z in zones],
+                          [(line["id1"], line["id2"]) for line in data.get("forbidden_lines", [])],
+                          [(r["id"], r["x"], r["y"]) for r in relief])
+
+    def __set_arrays(self, point_ids, points, zone_ids, zones, forbidden_lines, relief):
+        self.__point_ids = self.__frozen(point_ids, np.int64)
+        self.__points = self.__frozen(points, np.float64).reshape(-1, 2)
+        self.__circles = tuple(Circle(x, y, r) for x, y, r in np.asarray(zones, dtype=np.float64).reshape(-1, 3))
+        self.__zone_ids = self.__frozen(zone_ids, np.int64)
+        self.__zones = self.__frozen([(c.x, c.y, c.r) for c in self.__circles], np.float64).reshape(-1, 3)
+        self.__forbidden_lines = tuple((int(id1), int(id2)) for id1, id2 in forbidden_lines)
+        self.__relief = self.__frozen(relief, np.float64).reshape(-1, 3)
+        self.__point_index = {int(point_id): k for k, point_id in enumerate(self.__point_ids)}
+        known_lines = [(self.__point_index[id1], self.__point_index[id2]) for id1, id2 in self.__forbidden_lines
+                       if id1 in self.__point_index and id2 in self.__point_index]
+        self.__forbidden_pairs = self.__frozen(known_lines, np.int64).reshape(-1, 2)
+        self.__zone_grid = None
+        self.__visibility_graph = None
+        self.__waypoints = None
+
+    def __repr__(self):
+        return f"Scenario: points={len(self.__point_ids)}, zones={len(self.__circles)}, " \
+               f"forbidden_lines={len(self.__forbidden_lines)}, relief={len(self.__relief)}"
+
+    @classmethod
+    def from_file(cls, filename):
+        """Читает сценарий из json или jsonl файла (см. read_scenario)"""
+        return cls.from_arrays(**read_scenario(filename))
+
+    @classmethod
+    def from_arrays(cls, points, zones, lines, relief):
+        """Сценарий из массивов read_scenario: points (N, 3), zones (M, 4), lines (F, 2), relief (R, 3)"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        zones = np.asarray(zones, dtype=np.float64).reshape(-1, 4)
+        scenario = cls.__new__(cls)
+        scenario.__set_arrays(points[:, 0].astype(np.int64), points[:, 1:], zones[:, 0].astype(np.int64),
+                              zones[:, 1:], np.asarray(lines, dtype=np.int64).reshape(-1, 2).tolist(), relief)
+        return scenario
+
+    def to_data(self):
+        """Словарь в формате read_data, из которого можно снова построить сценарий"""
+        return {
+            "data_points": [{"id": int(i), "x": float(x), "y": float(y)}
+                            for i, (x, y) in zip(self.__point_ids, self.__points)],
+            "data_forbidden_zone": [{"id": int(i), "x": float(x), "y": float(y), "r": float(r)}
+                                    for i, (x, y, r) in zip(self.__zone_ids, self.__zones)],
+            "forbidden_lines": [{"id1": id1, "id2": id2} for id1, id2 in self.__forbidden_lines],
+            "relief": [{"id": int(i), "x": float(x), "y": float(y)} for i, x, y in self.__relief],
+        }
+
+    def with_zone(self, zone_id, x, y, r):
+        """Новый сценарий, в котором зона zone_id добавлена (или заменена, если уже была)"""
+        data = self.to_data()
+        zones = [z for z in data["data_forbidden_zone"] if z["id"] != zone_id]
+        data["data_forbidden_zone"] = zones + [{"id": zone_id, "x": x, "y": y, "r": r}]
+        return Scenario(data)
+
+    def without_zone(self, zone_id):
+        """Новый сценарий без зоны zone_id"""
+        data = self.to_data()
+        data["data_forbidden_zone"] = [z for z in data["data_forbidden_zone"] if z["id"] != zone_id]
+        return Scenario(data)
+
+    def with_point(self, point_id, x, y):
+        """Новый сценарий, в котором точка point_id добавлена в конец (или перенесена, если уже была)"""
+        data = self.to_data()
+        points = [p for p in data["data_points"] if p["id"] != point_id]
+        data["data_points"] = points + [{"id": point_id, "x": x, "y": y}]
+        return Scenario(data)
+
+    def without_point(self, point_id):
+        """Новый сценарий без точки point_id"""
+        data = self.to_data()
+        data["data_points"] = [p for p in data["data_points"] if p["id"] != point_id]
+        return Scenario(data)
+
+    def digest(self):
+        """Хэш содержимого сценария (точки, зоны, запретные коридоры, рельеф) - ключ кэша дорог"""
+        lines = np.array(self.__forbidden_lines, dtype=np.int64).reshape(-1, 2)
+        sha = hashlib.sha256()
+        for array in (self.__point_ids, self.__points, self.__zone_ids, self.__zones, lines, self.__relief):
+            sha.update(str(array.shape).encode())
+            sha.update(np.ascontiguousarray(array).tobytes())
+        return sha.hexdigest()
+
+    @staticmethod
+    def __frozen(values, dtype):
+        array = np.array(values, dtype=dtype)
+        array.flags.writeable = False
+        return array
+
+    @property
+    def point_ids(self):
+        """id точек, shape (N,)"""
+        return self.__point_ids
+
+    @property
+    def points(self):
+        """Координаты точек, shape (N, 2)"""
+        return self.__points
+
+    @property
+    def zone_ids(self):
+        """id запретных зон, shape (M,)"""
+        return self.__zone_ids
+
+    @property
+    def zones(self):
+        """Запретные зоны (x, y, r), shape (M, 3)"""
+        return self.__zones
+
+    @property
+    def circles(self):
+        """Запретные зоны в виде кортежа объектов Circle"""
+        return self.__circles
+
+    @property
+    def zone_grid(self):
+        """Равномерная сетка над зонами (ZoneGrid), строится один раз при первом обращении"""
+        if self.__zone_grid is None:
+            self.__zone_grid = ZoneGrid(self.__zones)
+        return self.__zone_grid
+
+    @property
+    def visibility_graph(self):
+        """Граф касательных к зонам (VisibilityGraph), строится один раз при первом обращении"""
+        if self.__visibility_graph is None:
+            self.__visibility_graph = VisibilityGraph(self.__zones, self.zone_grid)
+        return self.__visibility_graph
+
+    @property
+    def waypoints(self):
+        """Касательные из точек сценария к зонам для графа касательных (VisibilityGraph.waypoints), считаются один раз"""
+        if self.__waypoints is None:
+            self.__waypoints = self.visibility_graph.waypoints(self.__points)
+        return self.__waypoints
+
+    @property
+    def point_index(self):
+        """Словарь id точки -> её номер в points"""
+        return self.__point_index
+
+    @property
+    def forbidden_pairs(self):
+        """Запретные коридоры как пары номеров точек, shape (F, 2); коридоры с неизвестными id пропускаются"""
+        return self.__forbidden_pairs
+
+    @property
+    def forbidden_lines(self):
+        """Запретные воздушные коридоры - кортеж пар (id1, id2)"""
+        return self.__forbidden_lines
+
+    @property
+    def relief(self):
+        """Точки рельефа (id, x, y), shape (R, 3)"""
+        return self.__relief
@@ -0,0 +1,167 @@
+import numpy as np
+
+from config import GEOMETRIC_INACCURACY, ZONE_GRID_MAX_CELLS
+
+
+class ZoneGrid:
+    """Равномерная сетка над запретными зонами для быстрого отбора зон-кандидатов
+
+    Каждая зона записывается во все клетки, которые задевает её описанный квадрат (с запасом
+    GEOMETRIC_INACCURACY). Номера зон хранятся одним массивом, упорядоченным по клеткам, и смещениями
+    клеток в нём, поэтому запрос - это несколько векторных операций без перебора всех зон.
+    """
+
+    def __init__(self, zones):
+        self.__zones = np.asarray(zones, dtype=np.float64).reshape(-1, 3)
+        count = len(self.__zones)
+        if count == 0:
+            self.__shape = (0, 0)
+            self.__origin = np.zeros(2)
+            self.__cell = 1.0
+            self.__offsets = np.zeros(1, dtype=np.int64)
+            self.__members = np.empty(0, dtype=np.int64)
+            return
+
+        r = np.abs(self.__zones[:, 2]) + GEOMETRIC_INACCURACY
+        lows = self.__zones[:, :2] - r[:, np.newaxis]
+        highs = self.__zones[:, :2] + r[:, np.newaxis]
+        self.__origin = lows.min(axis=0)
+        extent = np.maximum(highs.max(axis=0) - self.__origin, GEOMETRIC_INACCURACY)
+        # клетка не меньше типичного диаметра зоны, а всего клеток порядка числа зон
+        cells = min(count, ZONE_GRID_MAX_CELLS)
+        self.__cell = max(2 * float(np.median(r)), float(np.sqrt(extent[0] * extent[1] / cells)))
+        self.__shape = tuple(int(n) for n in np.maximum(np.ceil(extent / self.__cell), 1))
+
+        first = self.__cell_coordinates(lows)
+        last = self.__cell_coordinates(highs)
+        spans = last - first + 1
+        sizes = spans[:, 0] * spans[:, 1]
+        zone_of_entry = np.repeat(np.arange(count), sizes)
+        local = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        ix = first[zone_of_entry, 0] + local % spans[zone_of_entry, 0]
+        iy = first[zone_of_entry, 1] + local // spans[zone_of_entry, 0]
+        cell_of_entry = iy * self.__shape[0] + ix
+
+        order = np.argsort(cell_of_entry, kind="stable")
+        self.__members = zone_of_entry[order]
+        self.__offsets = np.concatenate([[0], np.cumsum(np.bincount(cell_of_entry,
+                                                                    minlength=self.__shape[0] * self.__shape[1]))])
+
+    def __repr__(self):
+        return f"ZoneGrid: zones={len(self.__zones)}, cells={self.__shape[0]}x{self.__shape[1]}, cell={self.__cell}"
+
+    @property
+    def zones(self):
+        return self.__zones
+
+    def __cell_coordinates(self, points):
+        cells = np.floor((np.asarray(points, dtype=np.float64) - self.__origin) / self.__cell).astype(np.int64)
+        return np.clip(cells, 0, np.array(self.__shape) - 1)
+
+    def __members_of_cells(self, cells):
+        """Отсортированные номера зон, записанных в клетки cells (массив номеров клеток)"""
+        starts = self.__offsets[cells]
+        sizes = self.__offsets[cells + 1] - starts
+        entries = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        return np.unique(self.__members[entries])
+
+    def point_candidates(self, point):
+        """Номера зон, которым может принадлежать точка"""
+        if not len(self.__zones):
+            return np.empty(0, dtype=np.int64)
+        position = (np.array([point.x, point.y]) - self.__origin) / self.__cell
+        if (position < 0).any() or (position >= self.__shape).any():
+            return np.empty(0, dtype=np.int64)
+        ix, iy = self.__cell_coordinates([point.x, point.y])
+        return self.__members_of_cells(np.array([iy * self.__shape[0] + ix]))
+
+    def segment_candidates(self, point1, point2):
+        """Номера зон, которые может пересечь или коснуться отрезок point1-point2 (по возрастанию)
+
+        Отрезок обрезается по границам сетки, затем находятся все параметры t его пересечений с линиями сетки;
+        середина каждого промежутка между соседними t лежит в одной из клеток, через которые проходит отрезок.
+        """
+        if not len(self.__zones):
+            return np.empty(0, dtype=np.int64)
+        start = (np.array([point1.x, point1.y], dtype=np.float64) - self.__origin) / self.__cell
+        direction = (np.array([point2.x, point2.y], dtype=np.float64) - self.__origin) / self.__cell - start
+
+        low, high = 0.0, 1.0
+        lines = []
+        for axis in range(2):
+            if direction[axis] == 0:
+                if not 0 <= start[axis] <= self.__shape[axis]:
+                    return np.empty(0, dtype=np.int64)
+                continue
+            entry, leave = sorted(((0 - start[axis]) / direction[axis],
+                                   (self.__shape[axis] - start[axis]) / direction[axis]))
+            low, high = max(low, entry), min(high, leave)
+            lines.append((np.arange(1, self.__shape[axis]) - start[axis]) / direction[axis])
+        if low > high:
+            return np.empty(0, dtype=np.int64)
+
+        t = np.concatenate([[low, high]] + lines)
+        t = np.unique(t[(t >= low) & (t <= high)])
+        middles = (t[:-1] + t[1:]) / 2 if len(t) > 1 else t
+        cells = np.clip(np.floor(start + middles[:, np.newaxis] * direction).astype(np.int64),
+                        0, np.array(self.__shape) - 1)
+        return self.__members_of_cells(np.unique(cells[:, 1] * self.__shape[0] + cells[:, 0]))
+
+    def segments_candidates(self, starts, finishes):
+        """Пары (номер отрезка, номер зоны) для K отрезков starts[k]-finishes[k] - векторный segment_candidates
+
+        Как и в segment_candidates, отрезки обрезаются по границам сетки, а клетки отрезка находятся по серединам
+        промежутков между параметрами t его пересечений с линиями сетки; параметры всех отрезков собираются
+        в один массив и упорядочиваются внутри каждого отрезка. Возвращает два массива одной длины,
+        упорядоченные по номеру отрезка, а внутри отрезка - по номеру зоны.
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        finishes = np.asarray(finishes, dtype=np.float64).reshape(-1, 2)
+        if not len(self.__zones) or not len(starts):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        start = (starts - self.__origin) / self.__cell
+        direction = (finishes - self.__origin) / self.__cell - start
+        shape = np.array(self.__shape)
+
+        low, high = np.zeros(len(start)), np.ones(len(start))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for axis in range(2):
+                moving = direction[:, axis] != 0
+                entry = (0 - start[:, axis]) / direction[:, axis]
+                leave = (shape[axis] - start[:, axis]) / direction[:, axis]
+                low = np.where(moving, np.maximum(low, np.minimum(entry, leave)), low)
+                high = np.where(moving, np.minimum(high, np.maximum(entry, leave)), high)
+                high[~moving & ((start[:, axis] < 0) | (start[:, axis] > shape[axis]))] = -1
+        segments = np.flatnonzero(low <= high)
+
+        owners, parameters = [segments, segments], [low[segments], high[segments]]
+        for axis in range(2):
+            s, d = start[segments, axis], direction[segments, axis]
+            ends = np.stack([s + low[segments] * d, s + high[segments] * d])
+            first = np.maximum(np.floor(ends.min(axis=0)) + 1, 1).astype(np.int64)  # внутренние линии сетки
+            last = np.minimum(np.ceil(ends.max(axis=0)) - 1, shape[axis] - 1).astype(np.int64)
+            counts = np.maximum(last - first + 1, 0)
+            local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            lines = np.repeat(first, counts) + local
+            owner = np.repeat(np.arange(len(segments)), counts)
+            owners.append(segments[owner])
+            parameters.append((lines - s[owner]) / d[owner])
+        owners, parameters = np.concatenate(owners), np.concatenate(parameters)
+        # t в [0, 1], поэтому ключ owner + t / 2 упорядочивает по отрезку, а внутри него - по t (быстрее lexsort)
+        order = np.argsort(owners + parameters / 2)
+        owners, parameters = owners[order], parameters[order]
+
+        same = owners[:-1] == owners[1:]
+        owners = owners[:-1][same]
+        middles = (parameters[:-1][same] + parameters[1:][same]) / 2
+        cells = np.clip(np.floor(start[owners] + middles[:, np.newaxis] * direction[owners]).astype(np.int64),
+                        0, shape - 1)
+        cell_count = self.__shape[0] * self.__shape[1]
+        keys = np.unique(owners * cell_count + cells[:, 1] * self.__shape[0] + cells[:, 0])
+        owners, cells = keys // cell_count, keys % cell_count
+
+        begins = self.__offsets[cells]
+        sizes = self.__offsets[cells + 1] - begins
+        entries = np.repeat(begins - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        keys = np.unique(np.repeat(owners, sizes) * len(self.__zones) + self.__members[entries])
+        return keys // len(self.__zones), keys % len(self.__zones)
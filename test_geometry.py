@@ -118,3 +118,86 @@ def test_tangent_from_point_to_circle():
            or tangent_from_point_to_circle(point1, circle2) == [line2, line1]
     assert tangent_from_point_to_circle(point2, circle3) == [line3, line4] \
            or tangent_from_point_to_circle(point2, circle3) == [line4, line3]
+
+
+def test_segment_circle_crossings():
+    circles = np.array([[5, 0, 1], [2, 0, 0.5], [5, 5, 1], [10, 1, 1]])
+    crossed, t = segment_circle_crossings(Point(0, 0), Point(10, 0), circles)
+    assert crossed.tolist() == [True, True, False, True]
+    assert np.allclose(t[[0, 1, 3]], [0.4, 0.15, 1.0])
+    assert t[2] == np.inf
+
+    crossed, t = segment_circle_crossings(Point(0, 0), Point(3, 0), circles)
+    assert crossed.tolist() == [False, True, False, False]
+
+    crossed, t = segment_circle_crossings(Point(1, 1), Point(1, 1), circles)
+    assert not crossed.any()
+
+
+def test_segment_circle_crossings_matches_crossings():
+    rng = np.random.default_rng(1)
+    circles = np.column_stack([rng.uniform(0, 100, 50), rng.uniform(0, 100, 50), rng.uniform(1, 10, 50)])
+    for _ in range(20):
+        a = Point(*rng.uniform(0, 100, 2))
+        b = Point(*rng.uniform(0, 100, 2))
+        crossed, _ = segment_circle_crossings(a, b, circles)
+        line = line_by_two_points(a, b)
+        expected = [any(min(a.x, b.x) <= p.x <= max(a.x, b.x) and min(a.y, b.y) <= p.y <= max(a.y, b.y)
+                        for p in crossings(line, Circle(*c)))
+                    for c in circles]
+        assert crossed.tolist() == expected
+
+
+def test_blocked_segments():
+    rng = np.random.default_rng(2)
+    starts, finishes = rng.uniform(0, 100, (50, 2)), rng.uniform(0, 100, (50, 2))
+    circles = np.column_stack([rng.uniform(0, 100, 10), rng.uniform(0, 100, 10), rng.uniform(1, 10, 10)])
+    blocked = blocked_segments(starts, finishes, circles)
+    for k in range(len(starts)):
+        crossed, _ = segment_circle_crossings(Point(*starts[k]), Point(*finishes[k]), circles)
+        assert blocked[k] == crossed.any()
+    assert not blocked_segments(starts, finishes, np.empty((0, 3))).any()
+
+
+def test_segments_enter_circle_pairs():
+    rng = np.random.default_rng(4)
+    starts, finishes = rng.uniform(0, 100, (60, 2)), rng.uniform(0, 100, (60, 2))
+    finishes[0] = starts[0]  # вырожденный отрезок
+    circles = np.column_stack([rng.uniform(0, 100, 8), rng.uniform(0, 100, 8), rng.uniform(1, 20, 8)])
+    k, m = np.divmod(np.arange(len(starts) * len(circles)), len(circles))
+    inside = segments_enter_circle_pairs(starts[k], finishes[k], circles[m])
+    for c in range(len(circles)):
+        assert (inside[m == c] == segments_enter_circles(starts, finishes, circles[c:c + 1])).all()
+
+
+def test_primitives_have_no_dict():
+    assert not hasattr(Point(1, 2), "__dict__")
+    assert not hasattr(Circle(1, 2, 3), "__dict__")
+    assert not hasattr(Line(1, 2, 3), "__dict__")
+    assert Point(1, 2) == Point(1.005, 1.995) and Point(1, 2) != Point(1.02, 2)
+    assert isclose(100000, 100001) == bool(np.isclose(100000, 100001, atol=GEOMETRIC_INACCURACY))
+
+
+def test_batch_functions_match_scalar():
+    rng = np.random.default_rng(3)
+    points1 = rng.uniform(0, 100, (30, 2))
+    points2 = rng.uniform(0, 100, (30, 2))
+    points2[0, 0] = points1[0, 0]  # вертикальная прямая
+    circles = np.column_stack([rng.uniform(0, 100, 30), rng.uniform(0, 100, 30), rng.uniform(1, 30, 30)])
+    circles[1] = [points1[1, 0] + 5, 50, 5]  # касание
+
+    lines = line_by_two_points_batch(points1, points2)
+    distances = distance_between_points_batch(points1, points2)
+    found, counts = crossings_batch(lines, circles)
+    for k in range(30):
+        p1, p2, circle = Point(*points1[k]), Point(*points2[k]), Circle(*circles[k])
+        assert Line(*lines[k]) == line_by_two_points(p1, p2)
+        assert np.isclose(distances[k], distance_between_points(p1, p2))
+        expected = crossings(line_by_two_points(p1, p2), circle)
+        assert counts[k] == len(expected)
+        assert [Point(*p) for p in found[k, :counts[k]]] == expected
+
+    outside = np.linalg.norm(points1 - circles[:, :2], axis=1) > circles[:, 2]
+    tangents = tangent_from_point_to_circle_batch(points1[outside], circles[outside])
+    for k, (point, circle) in enumerate(zip(points1[outside], circles[outside])):
+        assert [Line(*line) for line in tangents[k]] == tangent_from_point_to_circle(Point(*point), Circle(*circle))
@@ -0,0 +1,116 @@
+import itertools
+import numpy as np
+
+from heuristics import tour_length, nearest_neighbour_tour, improve_tour, two_opt, or_opt, nearest_neighbours, \
+    split_tour, improve_routes, route_length
+from config import INFINITY
+
+
+def random_matrix(rng, n, symmetric=True):
+    points = rng.uniform(0, 100, (n, 2))
+    matrix = np.linalg.norm(points[:, np.newaxis] - points[np.newaxis], axis=-1)
+    if not symmetric:
+        matrix += rng.uniform(0, 20, (n, n))
+    np.fill_diagonal(matrix, np.inf)
+    return matrix
+
+
+def test_tour_length():
+    matrix = np.array([[np.inf, 1, 2],
+                       [3, np.inf, 1],
+                       [4, 2, np.inf]])
+    assert tour_length(matrix, [0, 1, 2]) == 6
+    assert tour_length(matrix, [0, 2, 1]) == 7
+
+
+def test_nearest_neighbour_tour():
+    matrix = np.array([[np.inf, 1, 5, 9],
+                       [1, np.inf, 2, 7],
+                       [5, 2, np.inf, 3],
+                       [9, 7, 3, np.inf]])
+    assert nearest_neighbour_tour(matrix).tolist() == [0, 1, 2, 3]
+    assert nearest_neighbour_tour(matrix, 3).tolist() == [3, 2, 1, 0]
+
+
+def test_local_search_keeps_permutation_and_start():
+    rng = np.random.default_rng(0)
+    for symmetric in (True, False):
+        matrix = random_matrix(rng, 60, symmetric)
+        start = nearest_neighbour_tour(matrix, 5)
+        for tour in (two_opt(matrix, start), or_opt(matrix, start), improve_tour(matrix, start),
+                     improve_tour(matrix, start, nearest_neighbours(matrix, 8))):
+            assert sorted(tour.tolist()) == list(range(60))
+            assert tour[0] == 5
+            assert tour_length(matrix, tour) <= tour_length(matrix, start) + 1e-9
+
+
+def test_improve_tour_close_to_optimum():
+    rng = np.random.default_rng(1)
+    for n in range(4, 9):
+        matrix = random_matrix(rng, n, symmetric=n % 2 == 0)
+        optimum = min(tour_length(matrix, (0,) + p) for p in itertools.permutations(range(1, n)))
+        tour = improve_tour(matrix, nearest_neighbour_tour(matrix))
+        assert tour_length(matrix, tour) <= 1.25 * optimum
+
+
+def test_forbidden_edges_are_avoided():
+    matrix = np.array([[np.inf, 1, INFINITY, 1],
+                       [1, np.inf, 1, INFINITY],
+                       [INFINITY, 1, np.inf, 1],
+                       [1, INFINITY, 1, np.inf]])
+    tour = improve_tour(matrix, [0, 2, 1, 3])
+    assert tour_length(matrix, tour) == 4
+
+
+def test_nearest_neighbours():
+    matrix = np.array([[np.inf, 1, 5, 9],
+                       [1, np.inf, 2, 7],
+                       [5, 2, np.inf, 3],
+                       [9, 7, 3, np.inf]])
+    assert nearest_neighbours(matrix, 2).tolist() == [[1, 2], [0, 2], [1, 3], [2, 1]]
+
+
+def test_split_tour_is_optimal():
+    rng = np.random.default_rng(11)
+    matrix = random_matrix(rng, 8)
+    tour = improve_tour(matrix, nearest_neighbour_tour(matrix))
+    for routeCount, limit in ((1, np.inf), (3, np.inf), (3, 200), (3, 180)):
+        routes = split_tour(matrix, tour, routeCount, limit)
+        assert len(routes) == routeCount
+        assert sum(routes, []) == tour[1:].tolist()
+        best = np.inf
+        allCuts = [cuts for count in range(routeCount) for cuts in itertools.combinations(range(1, 7), count)]
+        for cuts in allCuts:
+            parts = np.split(tour[1:], cuts)
+            lengths = [route_length(matrix, part, 0) for part in parts]
+            if max(lengths) <= limit:
+                best = min(best, sum(lengths))
+        found = [route_length(matrix, route, 0) for route in routes]
+        assert max(found) <= limit and np.isclose(sum(found), best)
+
+
+def test_improve_routes():
+    rng = np.random.default_rng(12)
+    matrix = random_matrix(rng, 30, symmetric=False)
+    routes = [list(range(1, 30, 3)), list(range(2, 30, 3)), list(range(3, 30, 3))]
+    before = sum(route_length(matrix, route, 0) for route in routes)
+    improved = improve_routes(matrix, routes, 0, np.full(3, np.inf))
+    assert sorted(sum(improved, [])) == list(range(1, 30))
+    assert sum(route_length(matrix, route, 0) for route in improved) < before
+
+    def excess(routes):
+        return sum(max(0, route_length(matrix, route, 0) - 300) for route in routes)
+
+    improved = improve_routes(matrix, routes + [[]], 0, np.full(4, 300.0))
+    assert sorted(sum(improved, [])) == list(range(1, 30))
+    assert excess(improved) < excess(routes)
+
+
+def test_split_tour_makespan():
+    rng = np.random.default_rng(14)
+    matrix = random_matrix(rng, 8)
+    tour = improve_tour(matrix, nearest_neighbour_tour(matrix))
+    routes = split_tour(matrix, tour, 3, objective="makespan")
+    best = min(max(route_length(matrix, part, 0) for part in np.split(tour[1:], cuts))
+               for count in range(3) for cuts in itertools.combinations(range(1, 7), count))
+    assert np.isclose(max(route_length(matrix, route, 0) for route in routes), best)
@@ -1,42 +1,20 @@
 import numpy as np
 from matrix_handler import MatrixHandler
+from scenario import Scenario
+from road_store import RoadStore
+from roadupdater import RoadUpdater
+from geometry import Point
+from config import INPUT_FILE, INFINITY
 
 handler = MatrixHandler()
 
 
 def test_extracting_data():
-    expected_data = {
-        "n": 1,
-        "data_points": [
-            {
-                "id": 0,
-                "x": 0,
-                "y": 0
-            },
-            {
-                "id": 1001,
-                "x": 30,
-                "y": 40
-            },
-            {
-                "id": 1002,
-                "x": 80,
-                "y": 80
-            }
-        ],
-        "forbidden_lines": [
-            {
-                "id1": 1001,
-                "id2": 1002
-            }
-        ]
-    }
     handler._MatrixHandler__extract_data("test_read_data.json")
-    assert expected_data == handler._MatrixHandler__data
-
-
-def test_distance():
-    assert MatrixHandler._MatrixHandler__distance((20, 30), (50, 70)) == 50
+    scenario = handler.scenario
+    assert scenario.point_ids.tolist() == [0, 1001, 1002]
+    assert scenario.points.tolist() == [[0, 0], [30, 40], [80, 80]]
+    assert scenario.forbidden_lines == ((1001, 1002),)
 
 
 def test_simple_distance_matrix():
@@ -48,24 +26,130 @@ def test_simple_distance_matrix():
     assert np.allclose(expected_matrix, handler._MatrixHandler__simple_matrix)
 
 
-def test_marked_matrix():
-    handler._MatrixHandler__extract_data("test_read_data.json")
-    handler._MatrixHandler__simple_distance_matrix()
-    handler._MatrixHandler__mark_matrix_by_point_ids()
-    expected_matrix = np.array([[0, 0, 1001, 1002],
-                                [0, np.inf, 50, 113.13708499],
-                                [1001, 50, np.inf, 64.0312423743],
-                                [1002, 113.13708499, 64.0312423743, np.inf]])
-    assert np.allclose(expected_matrix, handler._MatrixHandler__marked_matrix)
-
-
 def test_remove_forbidden_lines():
     handler._MatrixHandler__extract_data("test_read_data.json")
-    handler._MatrixHandler__simple_distance_matrix()
-    handler._MatrixHandler__mark_matrix_by_point_ids()
     handler._MatrixHandler__remove_forbidden_lines()
-    expected_matrix = np.array([[0, 0, 1001, 1002],
-                                [0, np.inf, 50, 113.13708499],
-                                [1001, 50, np.inf, 1e32],
-                                [1002, 113.13708499, 1e32, np.inf]])
+    expected_matrix = np.array([[np.inf, 50, 113.13708499],
+                                [50, np.inf, 1e32],
+                                [113.13708499, 1e32, np.inf]])
     assert np.allclose(expected_matrix, handler._MatrixHandler__matrix_without_forbidden_lines)
+    assert handler.point_ids.tolist() == [0, 1001, 1002]
+
+
+def test_distances_matrix_dtype():
+    matrix = MatrixHandler(Scenario.from_file(INPUT_FILE)).get_distances_matrix(dtype=np.float32)
+    expected = MatrixHandler(Scenario.from_file(INPUT_FILE)).get_distances_matrix()
+    assert matrix.dtype == np.float32
+    assert np.allclose(matrix, expected)
+    assert np.array_equal(np.isinf(matrix), np.isinf(expected))
+
+
+def test_forbidden_lines_mark_only_their_pairs():
+    data = Scenario.from_file(INPUT_FILE).to_data()
+    data["forbidden_lines"] = [{"id1": 1001, "id2": 1002}, {"id1": 1003, "id2": 1004}]
+    distances = MatrixHandler(Scenario(data)).get_distances_matrix()
+    forbidden = np.argwhere((distances > INFINITY - 1) & np.isfinite(distances)).tolist()
+    assert sorted(forbidden) == [[1, 2], [2, 1], [3, 4], [4, 3]]
+
+
+def test_roads_matrix_matches_road_updater():
+    scenario = Scenario.from_file(INPUT_FILE)
+    matrix_of_roads = MatrixHandler(scenario).get_roads_matrix()
+    updater = RoadUpdater(scenario)
+    points = scenario.points
+    for i in range(len(points)):
+        for j in range(len(points)):
+            road = matrix_of_roads[i + 1, j + 1]
+            if i == j or {scenario.point_ids[i], scenario.point_ids[j]} == {1003, 1004}:
+                assert road is None
+                continue
+            a, b = (i, j) if i < j else (j, i)
+            assert road == updater.update_road(Point(*points[a]), Point(*points[b]))
+
+
+def test_parallel_roads_matrix(monkeypatch):
+    monkeypatch.setattr("matrix_handler.ROADS_IN_TASK", 2)
+    scenario = Scenario.from_file(INPUT_FILE)
+    serial = MatrixHandler(scenario).get_roads_matrix()
+    parallel = MatrixHandler(scenario, workers=2).get_roads_matrix()
+    for i in range(serial.shape[0]):
+        for j in range(serial.shape[1]):
+            assert serial[i, j] == parallel[i, j] or (serial[i, j] is None and parallel[i, j] is None)
+
+
+def test_roads_cache(tmp_path, monkeypatch):
+    scenario = Scenario.from_file(INPUT_FILE)
+    roads, distances = MatrixHandler(scenario, cache_dir=tmp_path).get_roads_and_distances()
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    forbid_building_roads(monkeypatch)
+    cached_roads, cached_distances = MatrixHandler(scenario, cache_dir=tmp_path).get_roads_and_distances()
+    assert np.array_equal(distances, cached_distances)
+    assert_same_store(roads, cached_roads)
+
+
+def forbid_building_roads(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("дороги должны браться готовыми")
+    monkeypatch.setattr("matrix_handler.RoadUpdater", fail)
+
+
+def assert_same_store(expected, actual):
+    assert np.array_equal(expected.pairs, actual.pairs)
+    assert np.array_equal(expected.offsets, actual.offsets)
+    assert np.array_equal(expected.parts, actual.parts)
+
+
+def assert_same_roads(expected, actual):
+    assert expected.shape == actual.shape
+    for i in range(expected.shape[0]):
+        for j in range(expected.shape[1]):
+            assert expected[i, j] == actual[i, j] or (expected[i, j] is None and actual[i, j] is None)
+
+
+def test_update_roads_matrix(monkeypatch):
+    scenario = Scenario.from_file(INPUT_FILE)
+    handler = MatrixHandler(scenario)
+    roads = handler.get_roads_matrix()
+    changes = [scenario.without_zone(scenario.zone_ids[0]),
+               scenario.with_zone(scenario.zone_ids[1], 60, 60, 5),
+               scenario.with_zone(99, 45, 45, 4),
+               scenario.with_point(2000, 70, 20),
+               scenario.without_point(1005)]
+    for changed in changes:
+        roads = handler.update_roads_matrix(roads, changed)
+        assert_same_roads(MatrixHandler(changed).get_roads_matrix(), roads)
+        assert np.allclose(MatrixHandler(changed).get_distances_from_matrix_of_roads(roads),
+                           MatrixHandler(changed).get_road_store().distances())
+
+
+def test_update_rebuilds_roads_without_length():
+    scenario = Scenario.from_file(INPUT_FILE)
+    handler = MatrixHandler(scenario)
+    roads = handler.get_road_store()
+    parts = roads.parts.copy()
+    parts[roads.offsets[0], 1] = np.nan  # дорога, облёт которой не удался
+    broken = RoadStore(roads.size, roads.circles, roads.pairs, parts, roads.offsets)
+    assert np.isnan(broken.lengths[0])
+    changed = scenario.without_zone(scenario.zone_ids[0])
+    assert_same_store(MatrixHandler(changed).get_road_store(), handler.update_roads_matrix(broken, changed))
+
+
+def test_update_road_store_reuses_untouched_roads(monkeypatch):
+    scenario = Scenario.from_file(INPUT_FILE)
+    handler = MatrixHandler(scenario)
+    roads = handler.get_road_store()
+    forbid_building_roads(monkeypatch)
+    assert_same_store(roads, handler.update_roads_matrix(roads, scenario))
+    updated = handler.update_roads_matrix(roads, scenario.with_zone(99, 1000, 1000, 1))
+    assert_same_store(roads, updated)
+
+
+def test_road_store():
+    scenario = Scenario.from_file(INPUT_FILE)
+    store = MatrixHandler(scenario).get_road_store()
+    matrix = store.to_matrix()
+    assert np.allclose(store.distances(), MatrixHandler.get_distances_from_matrix_of_roads(matrix))
+    assert store[3, 4] is None and store[4, 3] is None  # запретный коридор 1003 - 1004
+    assert store[0, 2] == matrix[1, 3] and store[2, 0] == matrix[1, 3]
+    assert np.isclose(store.lengths[store.road_index(0, 2)], matrix[1, 3].length)
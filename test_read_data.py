@@ -1,5 +1,8 @@
-from read_data import read_data
-from config import TEST_READ_DATA_FILE
+import pytest
+
+from read_data import read_data, read_scenario, ScenarioFormatError
+from scenario import Scenario
+from config import TEST_READ_DATA_FILE, INPUT_FILE
 
 
 def test_read_data():
@@ -31,3 +34,45 @@ def test_read_data():
     }
 
     assert read_data(TEST_READ_DATA_FILE) == d
+
+
+def test_read_scenario_matches_read_data(monkeypatch):
+    monkeypatch.setattr("read_data.SCENARIO_READ_CHUNK", 7)  # значения рвутся на границах блоков
+    data = read_data(INPUT_FILE)
+    arrays = read_scenario(INPUT_FILE)
+    assert arrays["points"].tolist() == [[p["id"], p["x"], p["y"]] for p in data["data_points"]]
+    assert arrays["zones"].tolist() == [[z["id"], z["x"], z["y"], z["r"]] for z in data["data_forbidden_zone"]]
+    assert arrays["lines"].tolist() == [[line["id1"], line["id2"]] for line in data["forbidden_lines"]]
+    assert arrays["relief"].shape == (len(data["relief"]), 3)
+    assert Scenario.from_file(INPUT_FILE).digest() == Scenario(data).digest()
+
+
+def test_read_scenario_jsonl(tmp_path):
+    filename = tmp_path / "scenario.jsonl"
+    filename.write_text('{"type": "point", "id": 0, "x": 0, "y": 0}\n'
+                        '\n'
+                        '{"type": "point", "id": 7, "x": 3.5, "y": 4}\n'
+                        '{"type": "zone", "id": 1, "x": 2, "y": 2, "r": 1}\n'
+                        '{"type": "line", "id1": 0, "id2": 7}\n')
+    scenario = Scenario.from_file(filename)
+    assert scenario.point_ids.tolist() == [0, 7]
+    assert scenario.points.tolist() == [[0, 0], [3.5, 4]]
+    assert scenario.zones.tolist() == [[2, 2, 1]]
+    assert scenario.forbidden_pairs.tolist() == [[0, 1]]
+
+
+def test_read_scenario_reports_schema_errors(tmp_path):
+    broken = {
+        "missing.json": '{"data_points": [{"id": 0, "x": 0, "y": 0}, {"id": 1, "x": 5}]}',
+        "text.json": '{"data_points": [{"id": 0, "x": "0", "y": 0}]}',
+        "section.json": '{"data_forbidden_zone": {"id": 0}}',
+        "truncated.json": '{"data_points": [{"id": 0, "x": 0, "y": 0}',
+        "type.jsonl": '{"type": "point", "id": 0, "x": 0, "y": 0}\n{"type": "plane", "id": 1}\n',
+    }
+    for name, text in broken.items():
+        filename = tmp_path / name
+        filename.write_text(text)
+        with pytest.raises(ScenarioFormatError):
+            read_scenario(filename)
+    with pytest.raises(ScenarioFormatError, match=r"data_points\[1\]: поле y"):
+        read_scenario(tmp_path / "missing.json")
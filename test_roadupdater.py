@@ -1,20 +1,20 @@
 from roadupdater import *
+from read_data import read_data
+from scenario import Scenario
 
 
-def test_get_circles_from_data():
+def test_circles_from_scenario():
     data = read_data("input.json")
-    roadupdater = RoadUpdater()
-    roadupdater._RoadUpdater__get_circles_from_data(data)
-    assert roadupdater.circles == [Circle(45.100101, 44.100101, 11),
-                                   Circle(52.100201, 14.100201, 12),
-                                   Circle(86.100301, 44.100301, 13)
-                                   ]
+    roadupdater = RoadUpdater(Scenario(data))
+    assert list(roadupdater.circles) == [Circle(45.100101, 44.100101, 11),
+                                         Circle(52.100201, 14.100201, 12),
+                                         Circle(86.100301, 44.100301, 13)
+                                         ]
 
 
 def test_point_of_circle():
     data = read_data("input.json")
-    roadupdater = RoadUpdater()
-    roadupdater._RoadUpdater__get_circles_from_data(data)
+    roadupdater = RoadUpdater(Scenario(data))
     point = Point(85, 43)
     circle = Circle(86.100301, 44.100301, 13)
     assert roadupdater._RoadUpdater__point_of_circle(point) == [circle]
@@ -58,3 +58,36 @@ def test_update_road_no_bypass():
     old_road2 = Road()
     old_road2.add(Segment(Point(0, 0), Point(30, 40)))
     assert roadupdater.update_road(Point(0, 0), Point(30, 40)) == old_road2
+
+
+def test_shared_scenario_is_not_extended():
+    scenario = Scenario.from_file("input.json")
+    roadupdater = RoadUpdater(scenario)
+    for _ in range(3):
+        roadupdater.update_road(Point(0.100301, 0.100301), Point(100.100101, 13.100101))
+    assert roadupdater.circles is scenario.circles
+    assert len(roadupdater.circles) == 3
+
+
+def test_road_rows_round_trip():
+    scenario = Scenario.from_file("input.json")
+    road = RoadUpdater(scenario).update_road(Point(0.100301, 0.100301), Point(100.100101, 13.100101))
+    rows = road.to_rows(scenario.circles)
+    assert rows.shape == (3, 6)
+    assert sorted(rows[:, 5].tolist()) == [-1, -1, 1]
+    restored = Road.from_rows(rows, scenario.circles)
+    assert restored == road
+    assert np.isclose(restored.length, road.length)
+
+
+def test_update_road_around_overlapping_zones():
+    data = {"data_forbidden_zone": [{"id": 1, "x": 50, "y": 0, "r": 10}, {"id": 2, "x": 50, "y": 15, "r": 10}]}
+    roadupdater = RoadUpdater(Scenario(data))
+    road = roadupdater.update_road(Point(0, 5), Point(100, 5))
+    zones = roadupdater.scenario.zones
+    for part in road.parts:
+        if isinstance(part, Segment):
+            assert not segments_enter_circles((part.pointStart.x, part.pointStart.y),
+                                              (part.pointFinish.x, part.pointFinish.y), zones)[0]
+    assert road.parts[0].pointStart == Point(0, 5) and road.parts[-1].pointFinish == Point(100, 5)
+    assert 100 < road.length < 110
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from scenario import Scenario
+from geometry import Circle
+from config import INPUT_FILE, TEST_READ_DATA_FILE
+
+
+def test_scenario_from_file():
+    scenario = Scenario.from_file(INPUT_FILE)
+    assert scenario.point_ids.tolist() == [0, 1001, 1002, 1003, 1004, 1005, 1006, 1007]
+    assert scenario.points.shape == (8, 2)
+    assert np.allclose(scenario.points[1], (30.100101, 40.100101))
+    assert scenario.zones.shape == (3, 3)
+    assert scenario.circles[2] == Circle(86.100301, 44.100301, 13)
+    assert scenario.forbidden_lines == ((1004, 1003),)
+    assert scenario.relief.shape == (4, 3)
+
+
+def test_forbidden_pairs():
+    scenario = Scenario.from_file(INPUT_FILE)
+    assert scenario.point_index[1003] == 3
+    assert scenario.forbidden_pairs.tolist() == [[4, 3]]
+    data = scenario.to_data()
+    data["forbidden_lines"].append({"id1": 1001, "id2": 5555})  # неизвестная точка
+    assert Scenario(data).forbidden_pairs.tolist() == [[4, 3]]
+
+
+def test_scenario_without_zones():
+    scenario = Scenario.from_file(TEST_READ_DATA_FILE)
+    assert scenario.zones.shape == (0, 3)
+    assert scenario.circles == ()
+    assert scenario.relief.shape == (0, 3)
+
+
+def test_scenario_is_read_only():
+    scenario = Scenario.from_file(INPUT_FILE)
+    with pytest.raises(ValueError):
+        scenario.points[0, 0] = 1
+    with pytest.raises(ValueError):
+        scenario.zones[0, 2] = 1
+
+
+def test_scenario_digest():
+    scenario = Scenario.from_file(INPUT_FILE)
+    assert scenario.digest() == Scenario.from_file(INPUT_FILE).digest()
+    assert scenario.digest() != Scenario.from_file(TEST_READ_DATA_FILE).digest()
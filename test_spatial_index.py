@@ -0,0 +1,62 @@
+import numpy as np
+
+from spatial_index import ZoneGrid
+from geometry import Point, segment_circle_crossings
+from config import GEOMETRIC_INACCURACY
+
+
+def random_zones(rng, count):
+    return np.column_stack([rng.uniform(0, 1000, (count, 2)), rng.uniform(1, 15, count)])
+
+
+def test_segment_candidates_contain_crossed_zones():
+    rng = np.random.default_rng(1)
+    zones = random_zones(rng, 2000)
+    grid = ZoneGrid(zones)
+    for x1, y1, x2, y2 in rng.uniform(-100, 1100, (200, 4)):
+        point1, point2 = Point(x1, y1), Point(x2, y2)
+        crossed = np.flatnonzero(segment_circle_crossings(point1, point2, zones)[0])
+        candidates = grid.segment_candidates(point1, point2)
+        assert set(crossed) <= set(candidates)
+        assert len(candidates) < len(zones) / 4
+
+
+def test_segment_candidates_special_segments():
+    zones = np.array([[10, 10, 5], [30, 10, 5], [10, 30, 5], [60, 60, 1]])
+    grid = ZoneGrid(zones)
+    # касательная, вертикальный и горизонтальный отрезки, вырожденный отрезок и отрезок вне сетки
+    segments = [((0, 15 + GEOMETRIC_INACCURACY / 20), (40, 15 + GEOMETRIC_INACCURACY / 20)),
+                ((10, -5), (10, 50)), ((-5, 30), (50, 30)), ((30, 10), (30, 10)), ((-50, -50), (-40, 100))]
+    for (x1, y1), (x2, y2) in segments:
+        crossed = np.flatnonzero(segment_circle_crossings(Point(x1, y1), Point(x2, y2), zones)[0])
+        assert set(crossed) <= set(grid.segment_candidates(Point(x1, y1), Point(x2, y2)))
+    assert grid.segment_candidates(Point(-50, -50), Point(-40, 100)).size == 0
+
+
+def test_point_candidates():
+    rng = np.random.default_rng(2)
+    zones = random_zones(rng, 500)
+    grid = ZoneGrid(zones)
+    for x, y in rng.uniform(0, 1000, (300, 2)):
+        inside = np.flatnonzero(np.hypot(zones[:, 0] - x, zones[:, 1] - y) < zones[:, 2] + GEOMETRIC_INACCURACY)
+        assert set(inside) <= set(grid.point_candidates(Point(x, y)))
+
+
+def test_empty_grid():
+    grid = ZoneGrid(np.empty((0, 3)))
+    assert grid.segment_candidates(Point(0, 0), Point(1, 1)).size == 0
+    assert grid.point_candidates(Point(0, 0)).size == 0
+
+
+def test_segments_candidates_match_segment_candidates():
+    rng = np.random.default_rng(3)
+    grid = ZoneGrid(random_zones(rng, 1000))
+    segments = rng.uniform(-100, 1100, (300, 4))
+    segments[:3, 2:] = segments[:3, :2]  # вырожденные отрезки
+    segments[3:6, 2] = segments[3:6, 0]  # вертикальные
+    segments[6:9, 3] = segments[6:9, 1]  # горизонтальные
+    owners, zones = grid.segments_candidates(segments[:, :2], segments[:, 2:])
+    for k, (x1, y1, x2, y2) in enumerate(segments):
+        assert list(zones[owners == k]) == sorted(grid.segment_candidates(Point(x1, y1), Point(x2, y2)))
+    owners, zones = ZoneGrid(np.empty((0, 3))).segments_candidates(segments[:, :2], segments[:, 2:])
+    assert owners.size == 0 and zones.size == 0
@@ -0,0 +1,131 @@
+import numpy as np
+
+from visibility_graph import VisibilityGraph, MAX_ARC_SWEEP
+from geometry import Point, segments_enter_circles
+
+
+def path_length(path, zones, source, target):
+    """Длина пути; заодно проверяет, что путь непрерывен и не заходит в зоны"""
+    previous = np.array([source.x, source.y])
+    length = 0
+    for circle, start, finish in path:
+        start, finish = np.array([start.x, start.y]), np.array([finish.x, finish.y])
+        assert np.allclose(start, previous, atol=1e-6)
+        if circle < 0:
+            assert not segments_enter_circles(start, finish, zones)[0]
+            length += np.hypot(*(finish - start))
+        else:
+            x, y, r = zones[circle]
+            alpha = np.arctan2(start[1] - y, start[0] - x)
+            sweep = (np.arctan2(finish[1] - y, finish[0] - x) - alpha + np.pi) % (2 * np.pi) - np.pi
+            assert abs(sweep) <= MAX_ARC_SWEEP + 1e-9
+            angles = alpha + sweep * np.linspace(0, 1, 20)
+            arc = np.column_stack([x + r * np.cos(angles), y + r * np.sin(angles)])
+            assert not segments_enter_circles(arc, arc, zones).any()
+            length += r * abs(sweep)
+        previous = finish
+    assert np.allclose(previous, [target.x, target.y])
+    return length
+
+
+def test_single_circle():
+    zones = np.array([[0, 0, 5]])
+    graph = VisibilityGraph(zones)
+    source, target = Point(-10, 0), Point(10, 0)
+    path = graph.shortest_path(source, target)
+    # две касательные длины sqrt(100 - 25) и дуга между точками касания
+    expected = 2 * np.sqrt(75) + 5 * (np.pi - 2 * np.arccos(0.5))
+    assert np.isclose(path_length(path, zones, source, target), expected)
+    assert [circle for circle, _, _ in path] == [-1, 0, -1]
+
+
+def test_straight_road():
+    zones = np.array([[0, 0, 5]])
+    path = VisibilityGraph(zones).shortest_path(Point(-10, 6), Point(10, 6))
+    assert len(path) == 1 and path[0][0] == -1
+
+
+def test_overlapping_zones():
+    # две пересекающиеся зоны поперёк пути: облетать нужно обе сразу
+    zones = np.array([[0, 0, 5], [0, 7, 5]])
+    graph = VisibilityGraph(zones)
+    source, target = Point(-10, 1), Point(10, 1)
+    path = graph.shortest_path(source, target)
+    length = path_length(path, zones, source, target)
+    assert {circle for circle, _, _ in path} == {-1, 0}  # снизу короче, чем сверху через вторую зону
+    assert length > 20
+
+
+def test_chain_of_zones():
+    zones = np.array([[x, 0, 4] for x in range(0, 60, 6)], dtype=float)
+    graph = VisibilityGraph(zones)
+    source, target = Point(-10, 0), Point(64, 0)
+    path = graph.shortest_path(source, target)
+    assert path_length(path, zones, source, target) < 74 + 2 * 4 + 1
+
+
+def test_random_zones():
+    rng = np.random.default_rng(3)
+    for _ in range(10):
+        count = rng.integers(2, 20)
+        zones = np.column_stack([rng.uniform(0, 100, (count, 2)), rng.uniform(3, 15, count)])
+        graph = VisibilityGraph(zones)
+        for source, target in rng.uniform(-10, 110, (10, 2, 2)):
+            if segments_enter_circles(np.array([source, target]), np.array([source, target]), zones).any():
+                continue
+            source, target = Point(*source), Point(*target)
+            path = graph.shortest_path(source, target)
+            if path is not None:
+                assert path_length(path, zones, source, target) >= np.hypot(target.x - source.x,
+                                                                           target.y - source.y) - 1e-9
+
+
+def test_unreachable_point():
+    graph = VisibilityGraph(np.array([[0, 0, 5]]))
+    assert graph.shortest_path(Point(0, 1), Point(10, 0)) is None
+
+
+def test_paths_between_matches_single_queries():
+    rng = np.random.default_rng(7)
+    zones = np.column_stack([rng.uniform(0, 100, (12, 2)), rng.uniform(3, 12, 12)])
+    points = rng.uniform(-10, 110, (15, 2))
+    points = points[~segments_enter_circles(points, points, zones)]
+    graph = VisibilityGraph(zones)
+    pairs = np.array([(i, j) for i in range(len(points)) for j in range(i + 1, len(points))])
+    for (i, j), path in zip(pairs, graph.paths_between(points, pairs)):
+        source, target = Point(*points[i]), Point(*points[j])
+        single = graph.shortest_path(source, target)
+        assert (path is None) == (single is None)
+        if path is not None:
+            assert np.isclose(path_length(path, zones, source, target), path_length(single, zones, source, target))
+
+
+def test_many_targets_switch_to_one_tree():
+    # целей больше, чем успевают найти поиски A*, - оставшиеся ищутся одним деревом кратчайших путей
+    rng = np.random.default_rng(11)
+    zones = np.column_stack([rng.uniform(0, 100, (20, 2)), rng.uniform(2, 8, 20)])
+    points = rng.uniform(-5, 105, (120, 2))
+    points = points[~segments_enter_circles(points, points, zones)]
+    graph = VisibilityGraph(zones)
+    source = Point(*points[0])
+    targets = [Point(*point) for point in points[1:]]
+    for target, path in zip(targets, graph.shortest_paths(source, targets)):
+        single = graph.shortest_path(source, target)
+        assert (path is None) == (single is None)
+        if path is not None:
+            assert np.isclose(path_length(path, zones, source, target), path_length(single, zones, source, target))
+
+
+def test_paths_between_with_ready_waypoints():
+    rng = np.random.default_rng(5)
+    zones = np.column_stack([rng.uniform(0, 100, (10, 2)), rng.uniform(3, 10, 10)])
+    points = rng.uniform(-10, 110, (20, 2))
+    points = points[~segments_enter_circles(points, points, zones)]
+    graph = VisibilityGraph(zones)
+    pairs = np.array([(0, 3), (0, 5), (4, 2), (len(points) - 1, 1)])
+    ready = graph.paths_between(points, pairs, graph.waypoints(points))
+    for (i, j), path, local in zip(pairs, ready, graph.paths_between(points, pairs)):
+        source, target = Point(*points[i]), Point(*points[j])
+        assert (path is None) == (local is None)
+        if path is not None:
+            assert np.isclose(path_length(path, zones, source, target), path_length(local, zones, source, target))
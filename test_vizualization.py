@@ -0,0 +1,55 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from matrix_handler import MatrixHandler
+from scenario import Scenario
+from vizualization import draw_all, draw_path, draw_environment, routes_of
+from geometry import arc_point_counts
+from config import INPUT_FILE
+
+
+def test_routes_of():
+    assert routes_of([0, 2, 1, 0]) == [[0, 2, 1, 0]]
+    assert routes_of([[0, 2, 0], [0, 1, 0]]) == [[0, 2, 0], [0, 1, 0]]
+
+
+def test_draw_path_reuses_roads(monkeypatch):
+    scenario = Scenario.from_file(INPUT_FILE)
+    store = MatrixHandler(scenario).get_road_store()
+    monkeypatch.setattr("vizualization.MatrixHandler", None)  # дороги не должны строиться заново
+    path = [[0, 6, 2, 3, 7, 4, 1, 5, 0]]
+    _, ax = plt.subplots()
+    draw_path(ax, path, store)
+    draw_path(ax, path, store.to_matrix(), scenario.circles)
+    draw_environment(ax, scenario.to_data(), path)
+    segments, arcs = ax.collections[0], ax.collections[1]
+    assert ax.collections[2].get_segments()[0].tolist() == segments.get_segments()[0].tolist()
+    edges = zip(path[0], path[0][1:])
+    expected = sum(len(store[a, b].parts) for a, b in edges)
+    assert len(segments.get_segments()) + len(arcs.get_segments()) == expected
+    for arc in arcs.get_segments():  # точки дуг лежат на окружностях зон
+        distances = np.hypot(arc[:, np.newaxis, 0] - scenario.zones[:, 0], arc[:, np.newaxis, 1] - scenario.zones[:, 1])
+        assert np.isclose(distances, scenario.zones[:, 2]).all(axis=0).any()
+    plt.close("all")
+
+
+def test_render_to_file(tmp_path, monkeypatch):
+    scenario = Scenario.from_file(INPUT_FILE)
+    store = MatrixHandler(scenario).get_road_store()
+    monkeypatch.setattr("vizualization.plt", None)  # без pyplot и окна
+    path = [[0, 6, 2, 3, 7, 4, 1, 5, 0]]
+    assert draw_all(path, scenario.to_data(), store, filename=tmp_path / "tour.png") == tmp_path / "tour.png"
+    future = draw_all(path, scenario.to_data(), store, filename=tmp_path / "tour.svg", background=True)
+    assert future.result() == tmp_path / "tour.svg"
+    assert (tmp_path / "tour.png").read_bytes().startswith(b"\x89PNG")
+    assert b"<svg" in (tmp_path / "tour.svg").read_bytes()
+
+
+def test_arc_point_counts():
+    counts = arc_point_counts(np.array([0, 0.01, np.pi / 2, np.pi]), np.array([10, 10, 10, 1000]), 0.05, 50)
+    assert counts.tolist()[:2] == [2, 2]
+    assert counts[2] < 50 and counts[3] == 50
+    step = np.pi / 2 / (counts[2] - 1)
+    assert 10 * (1 - np.cos(step / 2)) <= 0.05
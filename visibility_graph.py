@@ -0,0 +1,382 @@
+import heapq
+import math
+import numpy as np
+
+from geometry import Point, segments_enter_circle_pairs
+from spatial_index import ZoneGrid
+from config import GEOMETRIC_INACCURACY, GRID_SEGMENTS_CHUNK
+
+"""
+Граф касательных для поиска кратчайшего облёта нескольких (в том числе пересекающихся) запретных зон.
+
+Вершины графа - точки касания общих касательных к парам окружностей, рёбра - отрезки этих касательных,
+не заходящие в зоны, и дуги окружностей между соседними точками касания, не заходящие в другие зоны.
+Граф строится один раз для сценария; для каждой пары точек к нему добавляются только касательные
+из этих точек, и путь до каждой цели ищется алгоритмом A* (Дейкстра с оценкой прямым расстоянием до цели).
+Проверка касательных и дуг на заход в зоны берёт зоны-кандидаты из сетки ZoneGrid, а не перебирает все зоны.
+"""
+
+TWO_PI = 2 * np.pi
+ANGLE_KEY_STEP = 8.0  # ключ точки на окружности c: c * ANGLE_KEY_STEP + угол (угол в [0, 2pi), 2pi < 8)
+MAX_ARC_SWEEP = np.pi / 2  # дуги пути режутся на части не больше этого угла (Arc считает длину по хорде)
+
+
+class VisibilityGraph:
+    def __init__(self, zones, grid=None):
+        self.__zones = np.array(zones, dtype=np.float64).reshape(-1, 3)
+        self.__zones[:, 2] = np.abs(self.__zones[:, 2])
+        self.__grid = ZoneGrid(self.__zones) if grid is None else grid
+        self.__build_bitangents()
+        self.__build_walls()
+        self.__build_arcs()
+
+    def __repr__(self):
+        return f"VisibilityGraph: zones={len(self.__zones)}, nodes={len(self.__points)}, " \
+               f"edges={sum(len(edges) for edges in self.__adjacency)}"
+
+    @property
+    def zones(self):
+        return self.__zones
+
+    ###########################################################
+
+    def __enter_zones(self, starts, finishes):
+        """Заходят ли отрезки (K, 2)-(K, 2) внутрь зон (см. segments_enter_circles); зоны-кандидаты берутся из сетки"""
+        inside = np.zeros(len(starts), dtype=bool)
+        for first in range(0, len(starts), GRID_SEGMENTS_CHUNK):
+            last = first + GRID_SEGMENTS_CHUNK
+            segments, zones = self.__grid.segments_candidates(starts[first:last], finishes[first:last])
+            segments += first
+            hit = segments_enter_circle_pairs(starts[segments], finishes[segments], self.__zones[zones])
+            inside[segments[hit]] = True
+        return inside
+
+    def __angles(self, circles, points):
+        centers = self.__zones[circles, :2]
+        return np.arctan2(points[:, 1] - centers[:, 1], points[:, 0] - centers[:, 0]) % TWO_PI
+
+    def __build_bitangents(self):
+        """Общие касательные ко всем парам окружностей (внешние и, для непересекающихся, внутренние)"""
+        i, j = np.triu_indices(len(self.__zones), 1)
+        c1, c2 = self.__zones[i, :2], self.__zones[j, :2]
+        r1, r2 = self.__zones[i, 2], self.__zones[j, 2]
+        delta = c2 - c1
+        d = np.hypot(delta[:, 0], delta[:, 1])
+        starts, finishes, first, second = [], [], [], []
+        for k in (1, -1):  # 1 - внешние касательные, -1 - внутренние
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cos = (r1 - k * r2) / d
+            ok = (d > 0) & (np.abs(cos) < 1)
+            v = delta[ok] / d[ok, np.newaxis]
+            perpendicular = np.column_stack([-v[:, 1], v[:, 0]])
+            sin = np.sqrt(1 - cos[ok] ** 2)
+            for sign in (1, -1):
+                # n - единичная нормаль касательной: касание в c1 + r1 * n и c2 + k * r2 * n
+                n = v * cos[ok, np.newaxis] + sign * perpendicular * sin[:, np.newaxis]
+                starts.append(c1[ok] + r1[ok, np.newaxis] * n)
+                finishes.append(c2[ok] + k * r2[ok, np.newaxis] * n)
+                first.append(i[ok])
+                second.append(j[ok])
+        starts = np.concatenate(starts) if starts else np.empty((0, 2))
+        finishes = np.concatenate(finishes) if finishes else np.empty((0, 2))
+        first = np.concatenate(first).astype(np.int64) if first else np.empty(0, dtype=np.int64)
+        second = np.concatenate(second).astype(np.int64) if second else np.empty(0, dtype=np.int64)
+
+        visible = ~self.__enter_zones(starts, finishes)
+        starts, finishes, first, second = starts[visible], finishes[visible], first[visible], second[visible]
+        # вершины 2k и 2k + 1 - концы k-той касательной
+        self.__points = np.empty((2 * len(starts), 2))
+        self.__points[0::2], self.__points[1::2] = starts, finishes
+        self.__circle = np.empty(2 * len(starts), dtype=np.int64)
+        self.__circle[0::2], self.__circle[1::2] = first, second
+        self.__angle = self.__angles(self.__circle, self.__points)
+
+        self.__adjacency = [[] for _ in range(len(self.__points))]
+        lengths = np.hypot(*(finishes - starts).T)
+        for k, length in enumerate(lengths.tolist()):
+            self.__adjacency[2 * k].append((2 * k + 1, length, -1, 0.0))
+            self.__adjacency[2 * k + 1].append((2 * k, length, -1, 0.0))
+
+    def __build_walls(self):
+        """Точки пересечения окружностей: дуга, проходящая через такую точку, заходит в соседнюю зону"""
+        i, j = np.triu_indices(len(self.__zones), 1)
+        delta = self.__zones[j, :2] - self.__zones[i, :2]
+        d = np.hypot(delta[:, 0], delta[:, 1])
+        r1, r2 = self.__zones[i, 2], self.__zones[j, 2]
+        crossed = (d > np.abs(r1 - r2)) & (d < r1 + r2 + GEOMETRIC_INACCURACY / 10)
+        i, j, delta, d, r1, r2 = i[crossed], j[crossed], delta[crossed], d[crossed], r1[crossed], r2[crossed]
+        base = np.arctan2(delta[:, 1], delta[:, 0])
+        half1 = np.arccos(np.clip((d ** 2 + r1 ** 2 - r2 ** 2) / (2 * d * r1), -1, 1))
+        half2 = np.arccos(np.clip((d ** 2 + r2 ** 2 - r1 ** 2) / (2 * d * r2), -1, 1))
+        keys = [i * ANGLE_KEY_STEP + (base + half1) % TWO_PI, i * ANGLE_KEY_STEP + (base - half1) % TWO_PI,
+                j * ANGLE_KEY_STEP + (base + np.pi + half2) % TWO_PI,
+                j * ANGLE_KEY_STEP + (base + np.pi - half2) % TWO_PI]
+        self.__wall_keys = np.sort(np.concatenate(keys))
+
+    def __build_arcs(self):
+        """Дуги между соседними по углу точками касания на каждой окружности (в обе стороны)"""
+        order = np.lexsort((self.__angle, self.__circle))
+        self.__node_order = order
+        self.__node_keys = self.__circle[order] * ANGLE_KEY_STEP + self.__angle[order]
+        circles = self.__circle[order]
+        if len(order) == 0:
+            return
+        group_start = np.searchsorted(circles, circles, side="left")
+        group_end = np.searchsorted(circles, circles, side="right")
+        following = np.arange(len(order)) + 1
+        following = np.where(following < group_end, following, group_start)
+        several = group_end - group_start > 1
+        a, b = order[several], order[following[several]]
+        sweep = (self.__angle[b] - self.__angle[a]) % TWO_PI
+        free = self.__arcs_are_free(self.__circle[a], self.__angle[a], sweep)
+        lengths = self.__zones[self.__circle[a], 2] * sweep
+        for start, finish, circle, s, length in zip(a[free].tolist(), b[free].tolist(),
+                                                    self.__circle[a][free].tolist(),
+                                                    sweep[free].tolist(), lengths[free].tolist()):
+            self.__adjacency[start].append((finish, length, circle, s))
+            self.__adjacency[finish].append((start, length, circle, -s))
+
+    def __arcs_are_free(self, circles, angles, sweeps):
+        """Не заходят ли дуги (окружность, начальный угол, угол поворота со знаком) в другие зоны"""
+        lengths = np.abs(sweeps)
+        low = np.where(sweeps >= 0, angles, angles + sweeps) % TWO_PI
+        high = low + lengths
+        base = circles * ANGLE_KEY_STEP
+        keys = self.__wall_keys
+        # точки пересечения строго внутри дуги; дуга через угол 0 считается двумя частями
+        inner = np.searchsorted(keys, base + np.minimum(high, TWO_PI), "left") \
+            - np.searchsorted(keys, base + low, "right")
+        wrapped = np.searchsorted(keys, base + np.maximum(high - TWO_PI, 0), "left") \
+            - np.searchsorted(keys, base, "left")
+        walls = inner + np.where(high > TWO_PI, wrapped, 0)
+
+        middle = low + lengths / 2
+        zones = self.__zones[circles]
+        middles = zones[:, :2] + zones[:, 2:] * np.column_stack([np.cos(middle), np.sin(middle)])
+        return (walls == 0) & ~self.__enter_zones(middles, middles)
+
+    def __query_tangents(self, points):
+        """Касательные из точек (T, 2) ко всем окружностям, не заходящие в зоны
+
+        Возвращает номер точки, окружность, угол и точку касания для каждой касательной.
+        """
+        delta = points[:, np.newaxis, :] - self.__zones[np.newaxis, :, :2]  # (T, M, 2)
+        d = np.hypot(delta[..., 0], delta[..., 1])
+        owners, outside = np.nonzero(d > self.__zones[np.newaxis, :, 2])
+        alpha = np.arccos(self.__zones[outside, 2] / d[owners, outside])
+        base = np.arctan2(delta[owners, outside, 1], delta[owners, outside, 0])
+        owners, circles = np.concatenate([owners, owners]), np.concatenate([outside, outside])
+        angles = np.concatenate([base + alpha, base - alpha]) % TWO_PI
+        touches = self.__zones[circles, :2] \
+            + self.__zones[circles, 2:] * np.column_stack([np.cos(angles), np.sin(angles)])
+        visible = ~self.__enter_zones(points[owners], touches)
+        return owners[visible], circles[visible], angles[visible], touches[visible]
+
+    def __neighbours(self, circles, angles):
+        """Соседние постоянные вершины на той же окружности: следующая и предыдущая против часовой стрелки"""
+        keys = circles * ANGLE_KEY_STEP + angles
+        low = np.searchsorted(self.__node_keys, circles * ANGLE_KEY_STEP, "left")
+        high = np.searchsorted(self.__node_keys, (circles + 1) * ANGLE_KEY_STEP, "left")
+        position = np.searchsorted(self.__node_keys, keys, "right")
+        following = np.where(position < high, position, low)
+        preceding = np.where(position - 1 >= low, position - 1, high - 1)
+        exists = high > low
+        order = np.append(self.__node_order, -1)
+        return exists, order[np.where(exists, following, -1)], order[np.where(exists, preceding, -1)]
+
+    def shortest_path(self, point1, point2):
+        """Кратчайший путь из point1 в point2 в обход зон
+
+        Возвращает список частей (номер окружности, начало, конец): номер -1 у отрезков, у дуг - номер зоны,
+        по которой идёт дуга не больше MAX_ARC_SWEEP. None, если из одной точки в другую не пройти.
+        """
+        return self.shortest_paths(point1, [point2])[0]
+
+    def shortest_paths(self, point, targets):
+        """Кратчайшие пути из point во все точки targets (касательные из всех точек считаются один раз)
+
+        Для каждой цели - список частей, как в shortest_path, или None.
+        """
+        waypoints = self.waypoints(np.array([(p.x, p.y) for p in [point] + list(targets)], dtype=np.float64))
+        return self.__paths(waypoints, 0, np.arange(1, len(targets) + 1))
+
+    def paths_between(self, points, pairs, waypoints=None):
+        """Кратчайшие пути для пар индексов pairs (K, 2) точек points (N, 2)
+
+        waypoints - готовый результат waypoints(points); без него касательные и дуги к графу считаются только
+        для точек, встречающихся в pairs. Затем для каждой точки-начала ищутся пути сразу до всех её пар
+        (см. __search). Возвращает список путей в порядке pairs.
+        """
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        if waypoints is None:
+            used, pairs = np.unique(pairs, return_inverse=True)
+            pairs = pairs.reshape(-1, 2)
+            waypoints = self.waypoints(np.asarray(points, dtype=np.float64).reshape(-1, 2)[used])
+        paths = [None] * len(pairs)
+        order = np.argsort(pairs[:, 0], kind="stable")
+        sources, starts = np.unique(pairs[order, 0], return_index=True)
+        for source, group in zip(sources.tolist(), np.split(order, starts[1:])):
+            for k, path in zip(group.tolist(), self.__paths(waypoints, source, pairs[group, 1])):
+                paths[k] = path
+        return paths
+
+    def waypoints(self, points):
+        """Точки маршрута (N, 2), их касательные к окружностям и дуги от точек касания к соседним вершинам графа
+
+        Считается один раз для набора точек и передаётся в paths_between, чтобы не пересчитывать его на каждый блок пар.
+        """
+        owners, circles, angles, touches = self.__query_tangents(points)
+        exists, following, preceding = self.__neighbours(circles, angles)
+        arcs = []  # (касательная, соседняя вершина, окружность, угол поворота со знаком) от точки касания
+        for neighbour, direction in ((following, 1), (preceding, -1)):
+            sweep = direction * ((direction * (self.__angle[neighbour[exists]] - angles[exists])) % TWO_PI)
+            arcs.append((np.flatnonzero(exists), neighbour[exists], circles[exists], sweep))
+        tangent, neighbour, circle, sweep = (np.concatenate(column) for column in zip(*arcs))
+        free = self.__arcs_are_free(circle, angles[tangent], sweep)
+        return {
+            "points": points,
+            "owners": owners,
+            "circles": circles,
+            "angles": angles,
+            "touches": touches,
+            "lengths": np.hypot(*(touches - points[owners]).T),
+            "arcs": (tangent[free], neighbour[free], circle[free], sweep[free]),
+        }
+
+    def __paths(self, waypoints, source, targets):
+        """Пути из точки маршрута source в точки targets по графу с добавленными касательными этих точек"""
+        points, owners = waypoints["points"], waypoints["owners"]
+        targets = np.asarray(targets, dtype=np.int64)
+        direct = ~self.__enter_zones(np.repeat(points[source][np.newaxis], len(targets), axis=0), points[targets])
+        paths = [[(-1, Point(*points[source]), Point(*points[target]))] if straight else None
+                 for target, straight in zip(targets.tolist(), direct)]
+        hidden = np.flatnonzero(~direct)
+        if not len(hidden):
+            return paths
+
+        # вершины запроса: count - source, count + 1 + k - k-тая скрытая цель, дальше касательные source и целей
+        count = len(self.__points)
+        goals = targets[hidden]
+        goal_node = np.full(len(points), -1, dtype=np.int64)
+        goal_node[goals] = count + 1 + np.arange(len(goals))
+        outgoing = np.flatnonzero(owners == source)
+        incoming = np.flatnonzero(goal_node[owners] >= 0)
+        tangent_node = np.full(len(owners), -1, dtype=np.int64)
+        tangent_node[outgoing] = count + 1 + len(goals) + np.arange(len(outgoing))
+        tangent_node[incoming] = count + 1 + len(goals) + len(outgoing) + np.arange(len(incoming))
+        used = np.concatenate([outgoing, incoming])
+        nodes = np.vstack([self.__points, points[source], points[goals], waypoints["touches"][used]])
+        angles = np.concatenate([self.__angle, np.zeros(1 + len(goals)), waypoints["angles"][used]])
+
+        lengths = waypoints["lengths"]
+        extra = {count: list(zip(tangent_node[outgoing].tolist(), lengths[outgoing].tolist(),
+                                 [-1] * len(outgoing), [0.0] * len(outgoing)))}
+        for q, goal, length in zip(tangent_node[incoming].tolist(), goal_node[owners[incoming]].tolist(),
+                                   lengths[incoming].tolist()):
+            extra.setdefault(q, []).append((goal, length, -1, 0.0))
+
+        # дуги от касательных source к соседним вершинам и от соседних вершин к касательным целей
+        tangent, neighbour, circle, sweep = waypoints["arcs"]
+        radius = self.__zones[circle, 2]
+        for k in np.flatnonzero(owners[tangent] == source).tolist():
+            extra.setdefault(int(tangent_node[tangent[k]]), []).append(
+                (int(neighbour[k]), float(radius[k] * abs(sweep[k])), int(circle[k]), float(sweep[k])))
+        for k in np.flatnonzero(goal_node[owners[tangent]] >= 0).tolist():
+            extra.setdefault(int(neighbour[k]), []).append(
+                (int(tangent_node[tangent[k]]), float(radius[k] * abs(sweep[k])), int(circle[k]), -float(sweep[k])))
+
+        # дуги между касательными source и целей на одной окружности
+        circles, tangent_angles = waypoints["circles"], waypoints["angles"]
+        s, t = np.nonzero(circles[outgoing][:, np.newaxis] == circles[incoming][np.newaxis, :])
+        s, t = outgoing[s], incoming[t]
+        ccw = (tangent_angles[t] - tangent_angles[s]) % TWO_PI
+        for sweeps in (ccw, ccw - TWO_PI):
+            free = self.__arcs_are_free(circles[s], tangent_angles[s], sweeps)
+            for a, b, c, sweep in zip(s[free].tolist(), t[free].tolist(), circles[s][free].tolist(),
+                                      sweeps[free].tolist()):
+                extra.setdefault(int(tangent_node[a]), []).append(
+                    (int(tangent_node[b]), float(self.__zones[c, 2] * abs(sweep)), c, sweep))
+
+        found = self.__search(count, goal_node[goals].tolist(), nodes, extra)
+        for k, goal in zip(hidden.tolist(), goal_node[goals].tolist()):
+            if goal in found:
+                paths[k] = self.__parts(found[goal], goal, nodes, angles)
+        return paths
+
+    def __search(self, source, targets, points, extra):
+        """Кратчайшие пути до вершин targets: A* до каждой цели по очереди с оценкой прямым расстоянием до неё
+
+        Если целей много и поиски A* вместе уже сняли с очереди больше вершин, чем есть в графе, оставшиеся
+        цели находятся одним деревом кратчайших путей (Дейкстра) - так многоцелевой запрос не дороже одного
+        полного обхода. Для каждой достигнутой цели - словарь {вершина: (предыдущая вершина, окружность,
+        угол поворота дуги)}, по которому собирается её путь.
+        """
+        found = {}
+        budget = len(points)
+        remaining = list(targets)
+        while remaining and budget > 0:
+            goal = remaining.pop(0)
+            previous, popped = self.__expand(source, {goal}, points, extra, points[goal])
+            budget -= popped
+            if goal in previous:
+                found[goal] = previous
+        if remaining:
+            previous, _ = self.__expand(source, set(remaining), points, extra, None)
+            found.update((goal, previous) for goal in remaining if goal in previous)
+        return found
+
+    def __expand(self, source, targets, points, extra, goal):
+        """Дейкстра от source, пока не сняты с очереди все targets (A* с оценкой до точки goal, если она задана)
+
+        Возвращает словарь предыдущих вершин и число снятых с очереди вершин.
+        """
+        remaining = set(targets)
+        adjacency = self.__adjacency
+        permanent = len(adjacency)
+        distances = [np.inf] * len(points)
+        distances[source] = 0.0
+        previous = {source: None}
+        queue = [(0.0, 0.0, source)]
+        popped = 0
+        while queue and remaining:
+            _, distance, node = heapq.heappop(queue)
+            if distance > distances[node]:  # устаревшая запись очереди
+                continue
+            popped += 1
+            remaining.discard(node)
+            for edges in (adjacency[node] if node < permanent else (), extra.get(node, ())):
+                for neighbour, length, circle, sweep in edges:
+                    candidate = distance + length
+                    if candidate < distances[neighbour]:
+                        distances[neighbour] = candidate
+                        previous[neighbour] = (node, circle, sweep)
+                        estimate = candidate if goal is None else candidate + math.hypot(
+                            points[neighbour][0] - goal[0], points[neighbour][1] - goal[1])
+                        heapq.heappush(queue, (estimate, candidate, neighbour))
+        return previous, popped
+
+    def __parts(self, previous, target, points, angles):
+        """Собирает путь: соседние дуги одной окружности склеиваются и режутся на части до MAX_ARC_SWEEP"""
+        steps = []
+        node = target
+        while previous[node] is not None:
+            parent, circle, sweep = previous[node]
+            if steps and circle >= 0 and steps[-1][2] == circle and steps[-1][3] * sweep > 0:
+                steps[-1] = (parent, steps[-1][1], circle, steps[-1][3] + sweep)
+            else:
+                steps.append((parent, node, circle, sweep))
+            node = parent
+
+        parts = []
+        for start, finish, circle, sweep in reversed(steps):
+            if circle < 0:
+                if np.hypot(*(points[finish] - points[start])) > 0:
+                    parts.append((-1, Point(*points[start]), Point(*points[finish])))
+                continue
+            pieces = max(1, int(np.ceil(abs(sweep) / MAX_ARC_SWEEP - 1e-9)))
+            x, y, r = self.__zones[circle]
+            turns = angles[start] + sweep * np.arange(1, pieces) / pieces
+            corners = [Point(*points[start])] + [Point(x + r * np.cos(a), y + r * np.sin(a)) for a in turns] \
+                + [Point(*points[finish])]
+            parts.extend((circle, corners[k], corners[k + 1]) for k in range(pieces) if sweep != 0)
+        return parts
@@ -1,51 +1,111 @@
 import matplotlib.pyplot as plt
 import logging
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
 
 from matrix_handler import MatrixHandler
-from config import POINT_COLOR, AIR_BASE_COLOR, FORBIDDEN_LINE_COLOR, FORBIDDEN_ZONE_COLOR, INPUT_FILE
+from road_store import RoadStore
+from scenario import Scenario
+from config import POINT_COLOR, AIR_BASE_COLOR, FORBIDDEN_LINE_COLOR, FORBIDDEN_ZONE_COLOR, LINE_COLOR, \
+    LINE_WIDTH, ARC_WIDTH
 
 log = logging.getLogger('trajectory')
 
 
-def draw_all(path, data):
-    """Drowing the path"""
+# рисунки в файл строятся по очереди в одном фоновом потоке; он создаётся при первом render_in_background
+_renderer = None
+
+
+def draw_all(path, data, roads=None, filename=None, background=False):
+    """Drowing the path
+
+    roads - уже построенные дороги (RoadStore или матрица MatrixHandler.get_roads_matrix);
+    если не заданы, строятся один раз по data. Если задан filename, рисунок сохраняется в файл
+    без окна (см. render); при background=True - в фоновом потоке, и сразу возвращается Future.
+    Иначе показывается окно matplotlib.
+    """
+    if filename is not None:
+        if background:
+            return render_in_background(path, data, roads, filename)
+        return render(path, data, roads, filename)
 
+    scenario = Scenario(data)
+    if roads is None:
+        roads = MatrixHandler(scenario).get_road_store()
     _, ax = plt.subplots(figsize=(6, 6))
-    draw_path(ax=ax, path=path)
+    draw_path(ax=ax, path=path, roads=roads, circles=scenario.circles)
     draw_environment(ax=ax, data=data, path=path)
     plt.show()
     log.info("нарисовали траекторию")
 
 
+def render(path, data, roads, filename):
+    """Сохраняет рисунок маршрута в файл (формат по расширению: .png, .svg, ...) без окна и без pyplot
+
+    Фигура рисуется холстом Agg и не попадает в глобальное состояние pyplot, поэтому функцию можно
+    вызывать на сервере без дисплея и из фонового потока (render_in_background).
+    """
+    scenario = Scenario(data)
+    if roads is None:
+        roads = MatrixHandler(scenario).get_road_store()
+    figure = Figure(figsize=(6, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    draw_path(ax=ax, path=path, roads=roads, circles=scenario.circles)
+    draw_environment(ax=ax, data=data, path=path)
+    figure.savefig(filename)
+    log.info(f"сохранили траекторию в {filename}")
+    return filename
+
+
+def render_in_background(path, data, roads, filename):
+    """Запускает render в фоновом потоке и сразу возвращает Future с именем файла"""
+    global _renderer
+    if _renderer is None:
+        _renderer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+    return _renderer.submit(render, path, data, roads, filename)
+
+
+def routes_of(path):
+    """Список маршрутов: path - один маршрут (список номеров точек) или список маршрутов, как у findPath"""
+    if len(path) and np.ndim(path[0]) == 0:
+        return [list(path)]
+    return [list(route) for route in path]
+
+
 def draw_environment(ax, data, path):
     """Drawing points of the root, forbidden lines, zones, etc."""
-    x = [data["data_points"][i]["x"] for i in path]  # x-координаты точек пути
-    y = [data["data_points"][i]["y"] for i in path]  # y-координаты точек пути
-    point_id = [str(data["data_points"][i]["id"]) for i in path]  # id точек пути
-    for px, py, text in zip(x[1:-1], y[1:-1], point_id[1:-1]):  # рисуем и подписываем все точки
-        logging.debug(f"{px, py, text}")
-        ax.plot(px, py, POINT_COLOR)
-        ax.annotate(text, (px, py))
-
-    ax.plot(x[0], y[0], AIR_BASE_COLOR)  # помечаем АБ зеленой точкой
-
-    forbidden_lines = [(x["id1"], x["id2"]) for x in data["forbidden_lines"]]
-    for p1, p2 in forbidden_lines:  # каждый запрещенный ВК помечаем красным
-        p1_coords = [(i["x"], i["y"]) for i in data["data_points"] if i["id"] == p1]
-        p2_coords = [(i["x"], i["y"]) for i in data["data_points"] if i["id"] == p2]
-        if len(p1_coords) > 0 and len(p2_coords) > 0:
-            x, y = zip(p1_coords[0], p2_coords[0])
-            ax.plot(x, y, FORBIDDEN_LINE_COLOR)
-
-    forbidden_zones = [(z["x"], z["y"], z["r"]) for z in data["data_forbidden_zone"]]
-    for zone in forbidden_zones:
-        ax.add_patch(plt.Circle((zone[0], zone[1]), radius=zone[2], color=FORBIDDEN_ZONE_COLOR))
-
-
-def draw_path(ax, path):
-    """Drawing the trajectory"""
-    handler = MatrixHandler()
-    for i in range(1, len(path)):
-        road_matrix = handler.get_roads_matrix(INPUT_FILE)[1:, 1:]
-        road = road_matrix[path[i - 1], path[i]]
-        road.draw(ax)
+    scenario = Scenario(data)
+    for route in routes_of(path):
+        route_points = scenario.points[route]
+        ax.plot(route_points[1:-1, 0], route_points[1:-1, 1], POINT_COLOR)  # все точки маршрута одним вызовом
+        for (px, py), point_id in zip(route_points[1:-1], scenario.point_ids[route][1:-1]):
+            ax.annotate(str(point_id), (px, py))
+        ax.plot(route_points[0, 0], route_points[0, 1], AIR_BASE_COLOR)  # помечаем АБ зеленой точкой
+
+    # каждый запрещенный ВК помечаем красным
+    ax.add_collection(LineCollection(scenario.points[scenario.forbidden_pairs], colors=FORBIDDEN_LINE_COLOR))
+    ax.add_collection(PatchCollection([Circle((x, y), radius=r) for x, y, r in scenario.zones],
+                                      color=FORBIDDEN_ZONE_COLOR))
+    ax.autoscale_view()
+
+
+def draw_path(ax, path, roads, circles=()):
+    """Drawing the trajectory
+
+    roads - RoadStore или матрица дорог с заголовком (тогда нужны circles - зоны сценария).
+    Отрезки и дуги всех дорог маршрута рисуются двумя LineCollection.
+    """
+    if not isinstance(roads, RoadStore):
+        roads = RoadStore.from_matrix(roads, list(circles))
+    edges = [(a, b) for route in routes_of(path) for a, b in zip(route, route[1:]) if a != b]
+    indices = [roads.road_index(a, b) for a, b in edges]
+    segments, arcs = roads.polylines([road for road in indices if road >= 0])
+    ax.add_collection(LineCollection(segments, colors=LINE_COLOR, linewidths=LINE_WIDTH))
+    ax.add_collection(LineCollection(arcs, colors=LINE_COLOR, linewidths=ARC_WIDTH))
+    ax.autoscale_view()